@@ -1,21 +1,39 @@
 # app/main.py
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse
+import hmac
+import json
+from fastapi import FastAPI, Request, HTTPException, Response, Cookie, Depends, Header, Query
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
-from src.data_loading import load_articles, load_profile_keywords
-from src.text_vectorizer import fit_vectorizer
-from src.profile_builder import build_profile_text, profile_to_vector
-from src.utils import get_article_image
-from src.recommender import (
-    recommend_for_profile,
-    recommend_hot_articles,
-    recommend_similar_to_article,
-    update_profile_with_likes,
+from src.data_loading import load_profile_keywords, profile_keywords_version
+from src.artifacts import (
+    load_inverted_index, load_memory_artifacts, load_meta, load_search_index, load_shared_artifacts,
+    load_token_corpus,
+)
+from src.config import (
+    SERVING_MODE, USE_INVERTED_INDEX, PAGE_CANDIDATES, EXECUTION_MODE,
+    HTTP_MAX_AGE_TAGS, HTTP_MAX_AGE_HOT, HTTP_MAX_AGE_SIMILAR, ADMIN_TOKEN,
 )
+from src.inverted_index import InvertedIndex
+from src.neighbors import load_neighbor_table
+from src.search_index import SearchIndex
+from src.typeahead import Typeahead
+from src.term_stats import load_term_stats
+from src.trend_service import TrendService
+from src.http_cache import ResponseCache, etag_matches, make_etag
+from src.pagination import CursorError, CursorStore
+from src.scoring_pool import LocalScorer, ScoringBusy, ScoringPool
+from src.result_cache import RecommendationCache, prefs_from_key, prefs_key, tags_key
+from src.session_store import SessionProfile, SessionProfileStore, new_session_id
+from src.profile_builder import build_profile_vector, compile_profile_keywords
+from src.utils import get_article_image
+from src.retrieval import build_id_index
+from src.cards import CardStore
+from src.recommender import clear_hot_ranking, hot_candidates, update_profile_with_likes
+from src.snapshot import Snapshot, SnapshotManager
 
 app = FastAPI()
 
@@ -25,10 +43,185 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 # Templates HTML
 templates = Jinja2Templates(directory="app/templates")
 
-# Chargement des données en mémoire (une fois au démarrage)
-articles_df = load_articles()
-profile_kw_df = load_profile_keywords()
-vectorizer, X_tfidf = fit_vectorizer(articles_df["text"])
+# Chargement des données en mémoire : un snapshot par version du bundle,
+# remplace a chaud (SnapshotManager) sans redemarrer les workers
+def load_snapshot():
+    """
+    Corpus, modele et structures derivees du bundle courant (demarrage et rechargements).
+    En mode "memory", un fichier articles qui ne correspond plus au bundle declenche
+    un fit TF-IDF complet pendant le rechargement (log [WARN], load_memory_artifacts).
+    """
+    profile_kw_df = load_profile_keywords()
+    if SERVING_MODE == "mmap":
+        # Workers multiples : articles + matrice TF-IDF partages via memory-map du bundle
+        articles_df, abstracts, vectorizer, X_tfidf, path = load_shared_artifacts()
+    else:
+        # Bundle TF-IDF persiste (python -m src.artifacts, ajouts src.incremental) ;
+        # refit complet seulement si le fichier articles a change (reecrit / reordonne
+        # apres des ajouts incrementaux : [WARN] et ajouts perdus, cf. load_memory_artifacts)
+        articles_df, abstracts, vectorizer, X_tfidf, path = load_memory_artifacts()
+    # Tout le snapshot est lu dans la meme version du bundle (path, jamais modifiee) ;
+    # path None : modele en memoire sans bundle correspondant, structures recalculees
+    mmap = SERVING_MODE == "mmap"
+    # Fichier des abstracts ouvert tout de suite : un bundle publie ensuite ne change pas ce snapshot
+    abstracts.column()
+    # Version du snapshot = empreinte du bundle, cle des caches en aval
+    meta = (load_meta(path) if path else None) or {}
+    version = meta.get("fingerprint") or f"{X_tfidf.shape}:{X_tfidf.nnz}"
+    # Index id -> ligne, partage par tous les endpoints
+    id_index = build_id_index(articles_df["id"])
+    # Posting lists du bundle pour le top-k des profils (MaxScore)
+    inverted_index = None
+    if USE_INVERTED_INDEX:
+        inverted_index = (
+            (load_inverted_index(path, mmap=mmap) if path else None) or InvertedIndex.from_matrix(X_tfidf)
+        )
+    # Table de voisins precalculee (python -m src.neighbors), None si absente
+    neighbors = load_neighbor_table(path, mmap=mmap) if path else None
+    # Scoring : threadpool (historique) ou pool de processus + micro-batch des profils
+    if EXECUTION_MODE == "pool" and path is not None:
+        # workers attaches a la version du bundle de ce snapshot
+        scorer = ScoringPool(articles_df, id_index, path=path)
+    else:
+        scorer = LocalScorer(
+            X_tfidf, articles_df, id_index=id_index, inverted_index=inverted_index, neighbors=neighbors,
+            abstracts=abstracts,
+            # corpus tokenise du trend_score : toujours memory-mappe (lu seulement quand les tendances changent)
+            token_corpus=load_token_corpus(path, mmap=True) if path else None,
+        )
+    return Snapshot(
+        version,
+        profile_kw_df=profile_kw_df,
+        # /api/tags is built from the keywords file, not the bundle: its own version
+        profile_kw_version=profile_keywords_version(profile_kw_df),
+        articles_df=articles_df,
+        abstracts=abstracts,
+        vectorizer=vectorizer,
+        X_tfidf=X_tfidf,
+        # Mots-cles de profil compiles + vecteur TF-IDF de chaque option (plus de transform par requete)
+        profile_lexicon=compile_profile_keywords(profile_kw_df, vectorizer),
+        id_index=id_index,
+        inverted_index=inverted_index,
+        # Index BM25 (title / abstract / author / field) pour /api/search
+        search_index=(
+            (load_search_index(path, mmap=mmap) if path else None)
+            or SearchIndex.from_articles(articles_df, abstracts)
+        ),
+        # Autocompletion (titres, auteurs, tags) pour la barre de recherche, a chaque frappe
+        typeahead=Typeahead.from_articles(articles_df, profile_kw_df),
+        neighbors=neighbors,
+        # Comptes (year, field, term) pour le fallback tendances corpus, None si absents
+        # ou comptes sur un autre corpus que celui du bundle (empreinte differente)
+        term_stats=load_term_stats(fingerprint=meta["fingerprint"]) if meta else None,
+        # Cartes article pre-encodees (JSON) : les reponses sont assemblees sans passer par pandas
+        card_store=CardStore(articles_df, abstracts),
+        scorer=scorer,
+    )
+
+
+def _on_snapshot_swap(old, new):
+    """Nouveau snapshot en service : les caches de l'ancienne version sont vides, les trends suivent le corpus."""
+    recommendation_cache.clear()
+    response_cache.clear()
+    clear_hot_ranking()
+    trend_service.set_corpus(new.articles_df, term_stats=new.term_stats, abstracts=new.abstracts)
+
+
+# Snapshot courant, recharge si le bundle change (meta.json surveille) ou via POST /admin/reload
+snapshots = SnapshotManager(load_snapshot, on_swap=_on_snapshot_swap)
+# Tendances en memoire, rafraichies en tache de fond (jamais d'appel arXiv dans une requete)
+trend_service = TrendService(
+    snapshots.current.articles_df, term_stats=snapshots.current.term_stats, abstracts=snapshots.current.abstracts
+)
+# Profils de session (base + somme des likes), cle = cookie session_id ;
+# propres a ce worker sauf si SESSION_SHARED_DIR est defini (plusieurs workers uvicorn)
+session_store = SessionProfileStore()
+# Cache vecteur de profil + classement par jeu de tags, invalide si le modele ou les trends changent
+recommendation_cache = RecommendationCache()
+# Curseurs de pagination signes (la suite de la liste est dans le curseur : valables sur tous les workers)
+cursor_store = CursorStore()
+# Reponses des endpoints stables (tags, hot, similar), cle = version + ressource
+response_cache = ResponseCache()
+
+
+async def current_snapshot():
+    """Snapshot pinned for the whole request: in-flight requests finish on it after a swap."""
+    with snapshots.use() as snap:
+        yield snap
+
+
+def _sync_cache_version(snap):
+    """Version (snapshot, trends) courante ; vide le cache de recos si elle a change."""
+    _, trends_version = trend_service.get()
+    version = (snap.version, trends_version)
+    recommendation_cache.set_version(version)
+    return version
+
+
+def _cards_response(body, next_cursor=None):
+    """JSON response from pre-encoded card bytes."""
+    # Body stays a plain list for existing clients, the next page is in a header
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _conditional_response(request, version, key, build, max_age):
+    """
+    ETag + Cache-Control for endpoints whose body only depends on `version`.
+    If-None-Match -> 304 without calling build(); otherwise the body comes from
+    the response cache, built once per (version, key).
+    build() returns (body, headers).
+    """
+    etag = make_etag(version, key)
+    cache_headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    cached = response_cache.get(version, key)
+    if cached is None:
+        cached = await build()
+        response_cache.set(version, key, *cached)
+    body, headers = cached
+    return Response(content=body, media_type="application/json", headers={**headers, **cache_headers})
+
+
+def _tags_profile_vector(snap, key, version):
+    """Vecteur de profil d'un jeu de tags normalise (tags_key), via le cache."""
+    prefs = {"field": list(key), "keywords": list(key)} if key else {}
+    return recommendation_cache.profile(
+        ("tags", key), lambda: build_profile_vector(prefs, snap.profile_lexicon), version
+    )
+
+
+def _prefs_profile_vector(snap, key, version):
+    """Idem pour un dict de preferences normalise (prefs_key)."""
+    return recommendation_cache.profile(
+        ("prefs", key), lambda: build_profile_vector(prefs_from_key(key), snap.profile_lexicon), version
+    )
+
+
+@app.on_event("startup")
+def start_background_services():
+    trend_service.start()
+    snapshots.start()
+
+
+@app.on_event("shutdown")
+def stop_background_services():
+    trend_service.stop()
+    snapshots.stop()
+    snapshots.current.scorer.close()
+
+
+@app.exception_handler(ScoringBusy)
+def scoring_busy_handler(request: Request, exc: ScoringBusy):
+    # Backpressure: fail fast instead of queueing behind a saturated pool
+    return JSONResponse({"detail": "Server busy, retry shortly"}, status_code=503, headers={"Retry-After": "1"})
+
+
+async def _hot_candidates(snap, depth):
+    ranking = await snap.scorer.hot_ranking(trend_service)
+    return hot_candidates(snap.articles_df, depth, ranking=ranking)
 
 
 # ---------- PAGES HTML ----------
@@ -40,70 +233,64 @@ def index(request: Request):
 
 
 @app.get("/explore", response_class=HTMLResponse)
-def explore_page(request: Request, tags: Optional[str] = None):
+async def explore_page(request: Request, tags: Optional[str] = None, snap: Snapshot = Depends(current_snapshot)):
     """
     Main logic hub for the Explore page.
     Handles both "Hot/Trending" (no tags) and "Personalized" (with tags) scenarios.
     """
     featured = []
     recommended = []
+    next_cursor = None
 
     try:
+        version = _sync_cache_version(snap)
+        # Candidate list computed once (PAGE_CANDIDATES deep), the page shows the first 10
+        # and the rest is served by /api/recommend/more through the cursor
+        columns = {}
         if tags:
             # Scenario A: User entered tags
             # Parse tags: "Machine Learning, NLP" -> ["machine_learning", "nlp"]
             tag_list = [t.strip().lower().replace(" ", "_") for t in tags.split(",") if t.strip()]
             
             if tag_list:
-                # Create preference dictionary mapping tags to fields and keywords
-                # We map to both 'field' and 'keywords' dimensions to be safe/broad
-                prefs = {
-                    "field": tag_list,
-                    "keywords": tag_list
-                }
-                
-                # Build profile and vectorize
-                profile_text = build_profile_text(prefs, profile_kw_df)
+                # Popular tag combinations hit the cache: same set of tags -> same vector and ranking
+                # The profile maps tags to both 'field' and 'keywords' dimensions to be safe/broad
+                key = tags_key(tag_list)
+                v_profile = _tags_profile_vector(snap, key, version)
                 
-                # If profile_text is empty (no tags matched), fallback to hot
-                if not profile_text.strip():
-                     recs_df = recommend_hot_articles(articles_df, top_k=10)
+                # If the profile is empty (no tags matched), fallback to hot
+                if v_profile.nnz == 0:
+                     rows, scores, columns = await _hot_candidates(snap, PAGE_CANDIDATES)
                 else:
-                    v_profile = profile_to_vector(profile_text, vectorizer)
-                    # Get top 10 recommendations
-                    recs_df = recommend_for_profile(v_profile, X_tfidf, articles_df, top_k=10)
+                    rows, scores = await recommendation_cache.ranking_async(
+                        ("tags", key), PAGE_CANDIDATES, lambda: snap.scorer.rank_profile(v_profile, PAGE_CANDIDATES),
+                        version,
+                    )
             else:
-                 recs_df = recommend_hot_articles(articles_df, top_k=10)
+                 rows, scores, columns = await _hot_candidates(snap, PAGE_CANDIDATES)
         else:
             # Scenario B: No tags / Empty -> Show Hot Articles
-            recs_df = recommend_hot_articles(articles_df, top_k=10)
+            rows, scores, columns = await _hot_candidates(snap, PAGE_CANDIDATES)
+
+        # Get top 10 recommendations (precomputed cards)
+        recs = snap.card_store.records(rows[:10], scores[:10], {name: col[:10] for name, col in columns.items()})
+        next_cursor = cursor_store.open(rows, scores, version, 10, columns)
 
         # Split Strategy
         # Featured: Top 1-5
-        featured = recs_df.head(5).to_dict(orient="records")
-        for f in featured:
-            f["image_url"] = get_article_image(f.get("field"))
+        featured = recs[:5]
         
         # Recommended: Top 6-10 (if available)
-        if len(recs_df) > 5:
-            recommended = recs_df.iloc[5:].to_dict(orient="records")
-            for r in recommended:
-                r["image_url"] = get_article_image(r.get("field"))
-        else:
-            recommended = []
+        recommended = recs[5:]
 
     except Exception as e:
         print(f"Error in explore_page: {e}")
         # Fallback to hot articles in case of error
         try:
-            recs_df = recommend_hot_articles(articles_df, top_k=10)
-            featured = recs_df.head(5).to_dict(orient="records")
-            for f in featured:
-                f["image_url"] = get_article_image(f.get("field"))
-            
-            recommended = recs_df.iloc[5:].to_dict(orient="records")
-            for r in recommended:
-                r["image_url"] = get_article_image(r.get("field"))
+            rows, scores, columns = await _hot_candidates(snap, 10)
+            recs = snap.card_store.records(rows, scores, columns)
+            featured = recs[:5]
+            recommended = recs[5:]
         except Exception:
             featured = []
             recommended = []
@@ -113,28 +300,28 @@ def explore_page(request: Request, tags: Optional[str] = None):
         "request": request,
         "featured": featured,
         "recommended": recommended,
-        "current_tags": tags or ""
+        "current_tags": tags or "",
+        "next_cursor": next_cursor or ""
     })
 
 
 @app.get("/article/{article_id}", response_class=HTMLResponse)
-def article_page(article_id: str, request: Request):
-    # Find the article in the dataframe
-    # Check if ID exists
-    article_row = articles_df[articles_df["id"].astype(str) == article_id]
-    
-    if article_row.empty:
+async def article_page(article_id: str, request: Request, snap: Snapshot = Depends(current_snapshot)):
+    # Find the article row through the id index
+    row = snap.id_index.get(article_id)
+
+    if row is None:
         raise HTTPException(status_code=404, detail="Article not found")
-    
-    article_data = article_row.iloc[0].to_dict()
+
+    article_data = snap.articles_df.iloc[row].to_dict()
+    # Full abstract is only needed here: read from the abstract store
+    article_data["abstract"] = snap.abstracts.get(row)
     article_data["image_url"] = get_article_image(article_data.get("field"))
     
     # Get similar articles
     try:
-        recs = recommend_similar_to_article(article_id, X_tfidf, articles_df, top_k=5)
-        recs_list = recs.to_dict(orient="records")
-        for r in recs_list:
-            r["image_url"] = get_article_image(r.get("field"))
+        rows, scores = await snap.scorer.rank_similar(article_id, 5)
+        recs_list = snap.card_store.records(rows, scores)
     except Exception as e:
         print(f"Error getting recommendations: {e}")
         recs_list = []
@@ -154,94 +341,205 @@ class ProfileRequest(BaseModel):
     liked_ids: list[str] = []
 
 
+class BatchProfileRequest(BaseModel):
+    profiles: list[ProfileRequest]
+    # 1..PAGE_CANDIDATES: a negative slice would return the end of the ranking
+    top_k: int = Field(5, ge=1, le=PAGE_CANDIDATES)
+
+
 class LikeRequest(BaseModel):
     article_id: str
     tags: Optional[str] = None
+    session_id: Optional[str] = None
 
 
 @app.post("/api/interact/like")
-def api_interact_like(req: LikeRequest):
-    # 1. Build base profile from tags
+async def api_interact_like(req: LikeRequest, session_id: Optional[str] = Cookie(None),
+                            snap: Snapshot = Depends(current_snapshot)):
+    # 1. Find the session profile (cookie, or session_id in the body for non-browser clients)
+    sid = req.session_id or session_id
+    tag_list = []
     if req.tags:
         tag_list = [t.strip().lower().replace(" ", "_") for t in req.tags.split(",") if t.strip()]
-        prefs = {"field": tag_list, "keywords": tag_list}
-        profile_text = build_profile_text(prefs, profile_kw_df)
-    else:
-        profile_text = ""
-
-    # 2. Vectorize base profile
-    # If profile_text is empty, vectorizer.transform([""]) returns a zero vector, which is what we want
-    v_profile = vectorizer.transform([profile_text])
-
-    # 3. Update with the new like
-    # We treat this single like as an update to the session profile
-    v_updated = update_profile_with_likes(v_profile, [req.article_id], X_tfidf, articles_df)
-
-    # 4. Recommend (exclude the liked article)
-    recs = recommend_for_profile(v_updated, X_tfidf, articles_df, top_k=5, exclude_ids={req.article_id})
-    
-    results = recs.to_dict(orient="records")
-    for r in results:
-        r["image_url"] = get_article_image(r.get("field"))
-    return results
+    key = tags_key(tag_list)
+    session_tags = ",".join(key)
+
+    version = _sync_cache_version(snap)
+    profile = session_store.get(sid)
+    if profile is None or profile.tags_key != session_tags or profile.version != snap.version:
+        # 2. New session (or tags changed): base profile from the tag cache
+        # With no tags the base is a zero vector, which is what we want
+        base = _tags_profile_vector(snap, key, version)
+        if profile is None:
+            sid = new_session_id()
+            profile = SessionProfile(base, session_tags, snap.version)
+        elif profile.version != snap.version:
+            # Session started on an older snapshot: replay its likes in the new vector space
+            profile = profile.rebased(base, snap.X_tfidf, snap.id_index, snap.version)
+            profile.tags_key = session_tags
+        else:
+            profile.base, profile.tags_key = base, session_tags
+
+    # 3. Incremental update with the new like (constant cost per like)
+    row = snap.id_index.get(req.article_id)
+    if row is not None:
+        profile.add_like(req.article_id, snap.X_tfidf[row])
+    # Stored after the like: with SESSION_SHARED_DIR the other workers see it on their next request
+    session_store.put(sid, profile)
+
+    # 4. Recommend (exclude the articles liked in this session)
+    rows, scores = await snap.scorer.rank_profile(
+        profile.vector(), PAGE_CANDIDATES, exclude_ids=profile.liked_ids | {req.article_id}
+    )
+    response = _cards_response(
+        snap.card_store.json_list(rows[:5], scores[:5]), cursor_store.open(rows, scores, version, 5)
+    )
+    response.set_cookie("session_id", sid, httponly=True, samesite="lax")
+    return response
 
 
 @app.post("/api/recommend/profile")
-def api_recommend_profile(req: ProfileRequest):
-    profile_text = build_profile_text(req.prefs, profile_kw_df)
-    v_profile = profile_to_vector(profile_text, vectorizer)
+async def api_recommend_profile(req: ProfileRequest, snap: Snapshot = Depends(current_snapshot)):
+    version = _sync_cache_version(snap)
+    key = prefs_key(req.prefs)
+    v_profile = _prefs_profile_vector(snap, key, version)
 
     if req.liked_ids:
         v_profile = update_profile_with_likes(
-            v_profile, req.liked_ids, X_tfidf, articles_df
+            v_profile, req.liked_ids, snap.X_tfidf, snap.articles_df, id_index=snap.id_index
         )
+        rows, scores = await snap.scorer.rank_profile(v_profile, PAGE_CANDIDATES)
+    else:
+        # Preferences only: the ranking is shared by every user with the same prefs
+        rows, scores = await recommendation_cache.ranking_async(
+            ("prefs", key), PAGE_CANDIDATES, lambda: snap.scorer.rank_profile(v_profile, PAGE_CANDIDATES), version
+        )
+    return _cards_response(
+        snap.card_store.json_list(rows[:5], scores[:5]), cursor_store.open(rows, scores, version, 5)
+    )
 
-    recs = recommend_for_profile(v_profile, X_tfidf, articles_df, top_k=5)
-    results = recs.to_dict(orient="records")
-    for r in results:
-        r["image_url"] = get_article_image(r.get("field"))
-    return results
+
+@app.post("/api/recommend/profile/batch")
+async def api_recommend_profile_batch(req: BatchProfileRequest, snap: Snapshot = Depends(current_snapshot)):
+    """
+    Batch version of /api/recommend/profile for digest jobs:
+    profile vectors are assembled from the cached option vectors
+    and scored together chunk by chunk.
+    Returns one list of articles per profile, in request order.
+    """
+    version = _sync_cache_version(snap)
+    vectors = []
+    for p in req.profiles:
+        v_profile = _prefs_profile_vector(snap, prefs_key(p.prefs), version)
+        if p.liked_ids:
+            v_profile = update_profile_with_likes(
+                v_profile, p.liked_ids, snap.X_tfidf, snap.articles_df, id_index=snap.id_index
+            )
+        vectors.append(v_profile)
+
+    all_ranked = await snap.scorer.rank_profiles(vectors, req.top_k)
+    return _cards_response(
+        b"[" + b",".join(snap.card_store.json_list(rows, scores) for rows, scores in all_ranked) + b"]"
+    )
 
 
 @app.get("/api/recommend/hot")
-def api_recommend_hot(top_k: int = 5):
-    recs = recommend_hot_articles(articles_df, top_k)
-    results = recs.to_dict(orient="records")
-    for r in results:
-        r["image_url"] = get_article_image(r.get("field"))
-    return results
+async def api_recommend_hot(request: Request, top_k: int = Query(5, ge=1, le=PAGE_CANDIDATES),
+                            snap: Snapshot = Depends(current_snapshot)):
+    # Same body for everyone until the corpus or the trends change: ETag / 304
+    version = _sync_cache_version(snap)
+    async def build():
+        rows, scores, columns = await _hot_candidates(snap, PAGE_CANDIDATES)
+        body = snap.card_store.json_list(rows[:top_k], scores[:top_k], {name: col[:top_k] for name, col in columns.items()})
+        # Same list, version and cursor window -> same cursor: the cached response keeps a valid cursor
+        cursor = cursor_store.open(rows, scores, version, top_k, columns)
+        return body, {"X-Next-Cursor": cursor} if cursor is not None else {}
+
+    return await _conditional_response(
+        request, version, ("hot", top_k, cursor_store.window()), build, HTTP_MAX_AGE_HOT
+    )
+
+
+@app.get("/api/recommend/more")
+def api_recommend_more(cursor: str, page_size: int = 10, snap: Snapshot = Depends(current_snapshot)):
+    """
+    Next page of a recommendation list (infinite scroll).
+    The cursor comes from the X-Next-Cursor header (or the explore page);
+    pages are slices of the candidate list carried by the signed cursor, nothing is rescored.
+    """
+    version = _sync_cache_version(snap)
+    try:
+        rows, scores, columns, next_cursor = cursor_store.page(cursor, version, max(1, min(page_size, 50)))
+    except CursorError as e:
+        # 410: list expired or computed on another model / trends -> reload the page
+        raise HTTPException(status_code=410 if e.expired else 400, detail=str(e))
+    return _cards_response(snap.card_store.json_list(rows, scores, columns), next_cursor)
 
 
 @app.get("/api/recommend/similar/{article_id}")
-def api_recommend_similar(article_id: str, top_k: int = 5):
-    recs = recommend_similar_to_article(article_id, X_tfidf, articles_df, top_k)
-    results = recs.to_dict(orient="records")
-    for r in results:
-        r["image_url"] = get_article_image(r.get("field"))
-    return results
+async def api_recommend_similar(request: Request, article_id: str, top_k: int = Query(5, ge=1, le=PAGE_CANDIDATES),
+                                snap: Snapshot = Depends(current_snapshot)):
+    # Neighbors only depend on the model, not on the trends
+    if article_id not in snap.id_index:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    async def build():
+        rows, scores = await snap.scorer.rank_similar(article_id, top_k)
+        return snap.card_store.json_list(rows, scores), {}
+
+    return await _conditional_response(
+        request, snap.version, ("similar", article_id, top_k), build, HTTP_MAX_AGE_SIMILAR
+    )
 
 
 @app.get("/api/search")
-def api_search(q: str):
-    # Filter for titles containing the query (case-insensitive)
-    df = articles_df[articles_df["title"].str.contains(q, case=False, na=False)]
-    
-    # Return top 10 results with specific fields
-    results = df[["id", "title", "author", "field"]].head(10).to_dict(orient="records")
-    for r in results:
-        r["image_url"] = get_article_image(r.get("field"))
-    return results
+def api_search(q: str, snap: Snapshot = Depends(current_snapshot)):
+    # BM25 multi-champs, prefixe sur le dernier mot, "phrases" entre guillemets
+    rows, scores = snap.search_index.search(q, snap.articles_df, top_k=10, abstracts=snap.abstracts)
+
+    # Return top 10 results as cards
+    return _cards_response(snap.card_store.json_list(rows, scores))
+
+
+@app.get("/api/autocomplete")
+def api_autocomplete(q: str = "", limit: int = 8, snap: Snapshot = Depends(current_snapshot)):
+    # Prefix lookup only (no scoring), cheap enough to call on every keystroke
+    return snap.typeahead.complete(q, limit=max(1, min(limit, 20)))
 
 
 @app.get("/api/tags")
-def get_tags():
+async def get_tags(request: Request, snap: Snapshot = Depends(current_snapshot)):
     """
     Returns a list of formatted tags from the profile keywords CSV.
     Example: ["Machine Learning", "Deep Learning", ...]
+    Computed once per (model version, keywords file content), then served from the response cache / 304.
+    """
+    async def build():
+        formatted_tags = []
+        if "option" in snap.profile_kw_df.columns:
+            # Get unique options, replace underscores with spaces, and title case
+            raw_options = snap.profile_kw_df["option"].dropna().unique()
+            formatted_tags = sorted(set(opt.replace("_", " ").title() for opt in raw_options))
+        return json.dumps(formatted_tags, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), {}
+
+    version = (snap.version, snap.profile_kw_version)
+    return await _conditional_response(request, version, ("tags",), build, HTTP_MAX_AGE_TAGS)
+
+
+# ---------- ADMIN ----------
+
+@app.post("/admin/reload", status_code=202)
+def admin_reload(x_admin_token: Optional[str] = Header(None)):
+    """
+    Loads a new snapshot (current bundle) in the background and swaps it in.
+    Requests in flight finish on the old snapshot. Only reloads this worker:
+    the other workers pick the new bundle up through the meta.json watcher.
+    Disabled unless ADMIN_TOKEN is set (X-Admin-Token header).
     """
-    if "option" in profile_kw_df.columns:
-        # Get unique options, replace underscores with spaces, and title case
-        raw_options = profile_kw_df["option"].dropna().unique()
-        formatted_tags = [opt.replace("_", " ").title() for opt in raw_options]
-        return sorted(list(set(formatted_tags)))
-    return []
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    # started = False: a reload was already running, it will pick up the same bundle
+    started = snapshots.reload()
+    return {"started": started, "version": snapshots.current.version}
@@ -19,30 +19,50 @@ function setupSearch(inputId) {
     
     input.parentElement.appendChild(dropdown);
 
-    let debounceTimer;
+    // Suggestions on every keystroke (prefix lookup, no debounce needed).
+    // Responses can come back out of order: only the latest one is rendered.
+    let requestSeq = 0;
+
+    async function fetchAndRender(url, render) {
+        const seq = ++requestSeq;
+        try {
+            const response = await fetch(url);
+            if (!response.ok) throw new Error('Network response was not ok');
+            const results = await response.json();
+            if (seq === requestSeq) render(results, dropdown);
+        } catch (error) {
+            console.error('Search error:', error);
+        }
+    }
+
+    // Full-text search (BM25), used on Enter and when an author is picked
+    function runSearch(query) {
+        fetchAndRender(`/api/search?q=${encodeURIComponent(query)}`, renderResults);
+    }
 
     input.addEventListener('input', (e) => {
         const query = e.target.value.trim();
-        
-        clearTimeout(debounceTimer);
-        
-        if (query.length < 2) {
+
+        if (query.length < 1) {
+            requestSeq++;
             dropdown.classList.add('hidden');
             dropdown.innerHTML = '';
             return;
         }
 
-        debounceTimer = setTimeout(async () => {
-            try {
-                const response = await fetch(`/api/search?q=${encodeURIComponent(query)}`);
-                if (!response.ok) throw new Error('Network response was not ok');
-                const results = await response.json();
-                
-                renderResults(results, dropdown);
-            } catch (error) {
-                console.error('Search error:', error);
-            }
-        }, 300);
+        fetchAndRender(`/api/autocomplete?q=${encodeURIComponent(query)}`, (results) => {
+            renderSuggestions(results, dropdown, (author) => {
+                input.value = author;
+                runSearch(author);
+            });
+        });
+    });
+
+    input.addEventListener('keydown', (e) => {
+        if (e.key === 'Enter' && input.value.trim().length > 0) {
+            e.preventDefault();
+            runSearch(input.value.trim());
+        }
     });
 
     // Close dropdown when clicking outside
@@ -54,12 +74,52 @@ function setupSearch(inputId) {
     
     // Show dropdown again if input has value and is focused
     input.addEventListener('focus', () => {
-        if (input.value.trim().length >= 2 && dropdown.children.length > 0) {
+        if (input.value.trim().length >= 1 && dropdown.children.length > 0) {
             dropdown.classList.remove('hidden');
         }
     });
 }
 
+function renderSuggestions(results, dropdown, onAuthor) {
+    dropdown.innerHTML = '';
+
+    if (results.length === 0) {
+        dropdown.classList.add('hidden');
+        return;
+    }
+
+    const badges = { title: 'Article', author: 'Author', tag: 'Topic' };
+    results.forEach(suggestion => {
+        const item = document.createElement('a');
+        if (suggestion.type === 'title') {
+            item.href = `/article/${suggestion.id}`;
+        } else if (suggestion.type === 'tag') {
+            item.href = `/explore?tags=${encodeURIComponent(suggestion.label)}`;
+        } else {
+            item.href = '#';
+            item.addEventListener('click', (e) => {
+                e.preventDefault();
+                onAuthor(suggestion.label);
+            });
+        }
+        item.className = 'flex items-center gap-2 p-3 hover:bg-gray-100 dark:hover:bg-slate-800 transition-colors border-b border-gray-200/50 dark:border-gray-700/50 last:border-0 text-left';
+
+        const badge = document.createElement('span');
+        badge.className = 'text-[10px] uppercase tracking-wide text-gray-400 dark:text-gray-500 w-12 shrink-0';
+        badge.textContent = badges[suggestion.type] || '';
+
+        const label = document.createElement('span');
+        label.className = 'text-sm text-gray-900 dark:text-gray-100 line-clamp-1';
+        label.textContent = suggestion.label;
+
+        item.appendChild(badge);
+        item.appendChild(label);
+        dropdown.appendChild(item);
+    });
+
+    dropdown.classList.remove('hidden');
+}
+
 function renderResults(results, dropdown) {
     dropdown.innerHTML = '';
     
@@ -3,7 +3,10 @@ import os
 from src.utils import (
     get_concept_id, fetch_papers_by_concept, 
 )
-from src.config import N_PER_CATEGORY, OUTPUT_FILE, OUTPUT_PARQUET, CATEGORY_LIST
+from src.config import N_PER_CATEGORY, OUTPUT_FILE, OUTPUT_PARQUET, CATEGORY_LIST, TERM_STATS_PATH
+from src.term_stats import build_term_stats, save_term_stats
+from src.artifacts import corpus_fingerprint
+from src.data_loading import AbstractStore, load_articles
 
 # MAIN
 
@@ -55,6 +58,14 @@ def main():
         
         df.to_parquet(OUTPUT_PARQUET, index=False, compression="snappy")
         print(f"Saved Parquet to {OUTPUT_PARQUET}")
+
+        # Comptes de termes par (annee, field) pour les tendances corpus, sur le
+        # corpus relu tel que le bundle le lira (memes lignes que l'empreinte)
+        articles_df = load_articles(OUTPUT_PARQUET)
+        abstracts = AbstractStore.from_articles(OUTPUT_PARQUET)
+        fingerprint = corpus_fingerprint(articles_df, abstracts)
+        save_term_stats(build_term_stats(articles_df, abstracts), fingerprint=fingerprint)
+        print(f"Saved term stats to {TERM_STATS_PATH}")
     else:
         print("No data collected.")
 
@@ -1,6 +1,6 @@
 # main.py
 import joblib
-from src.data_loading import load_articles, load_profile_keywords
+from src.data_loading import AbstractStore, article_texts, load_articles, load_profile_keywords
 from src.text_vectorizer import fit_vectorizer
 from src.profile_builder import build_profile_text, profile_from_text, profile_to_vector
 from src.recommender import (
@@ -18,6 +18,7 @@ def main():
     logger.info("1. Loading data")
     print(">> Loading data...")
     articles_df = load_articles()
+    abstracts = AbstractStore.from_articles()
     profile_kw_df = load_profile_keywords()
 
     print(f"  - {len(articles_df)} articles loaded")
@@ -26,7 +27,7 @@ def main():
     # 2) TF-IDF sur le texte des articles
     logger.info("2. Fitting TF-IDF vectorizer")
     print(">> Fitting TF-IDF vectorizer...")
-    vectorizer, X_tfidf = fit_vectorizer(articles_df["text"])
+    vectorizer, X_tfidf = fit_vectorizer(article_texts(articles_df, abstracts))
     print(f"  - Matrix shape: {X_tfidf.shape}\n")
 
     # 3) Simuler des préférences utilisateur
@@ -92,11 +93,11 @@ def main():
     # 6) Hot topics (arXiv ou corpus) + hot articles
     logger.info("6. Recommending hot articles based on trending topics")
     print(">> Getting hot terms (arXiv API or corpus fallback)...")
-    hot_terms = get_hot_terms(articles_df, top_n=10)
+    hot_terms = get_hot_terms(articles_df, top_n=10, abstracts=abstracts)
     print("Hot terms:", hot_terms, "\n")
 
     print(">> Recommending hot articles...")
-    recs_hot = recommend_hot_articles(articles_df, top_k=5)
+    recs_hot = recommend_hot_articles(articles_df, top_k=5, abstracts=abstracts)
     print("Top-5 hot articles:")
     print(recs_hot[["id", "title", "field", "year", "cite_nb"]], "\n")
 
@@ -0,0 +1,470 @@
+import json
+import hashlib
+import shutil
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from scipy.sparse import csr_matrix
+from src.config import (
+    ARTIFACTS_DIR, ARTIFACT_VERSION, BUNDLE_KEEP,
+    TFIDF_MAX_FEATURES, TFIDF_NGRAM_RANGE, TFIDF_STOP_WORDS,
+)
+from src.data_loading import AbstractStore, article_texts, load_articles
+from src.text_vectorizer import fit_vectorizer
+from src.inverted_index import InvertedIndex
+from src.search_index import SearchIndex
+from src.trend_matcher import TokenCorpus, build_token_corpus
+
+# Fichiers du bundle
+VECTORIZER_FILE = "vectorizer.joblib"
+X_DATA_FILE = "X_data.npy"
+X_INDICES_FILE = "X_indices.npy"
+X_INDPTR_FILE = "X_indptr.npy"
+# Posting lists (vue CSC) pour la recherche MaxScore
+POSTINGS_INDPTR_FILE = "P_indptr.npy"
+POSTINGS_INDICES_FILE = "P_indices.npy"
+POSTINGS_DATA_FILE = "P_data.npy"
+POSTINGS_MAX_FILE = "P_max.npy"
+IDS_FILE = "ids.npy"
+ARTICLES_FILE = "articles.arrow"
+ABSTRACTS_FILE = "abstracts.arrow"
+META_FILE = "meta.json"
+# Racine du bundle : une version publiee par dossier (jamais modifiee apres
+# publication) + pointeur CURRENT vers la version servie
+CURRENT_FILE = "CURRENT"
+PUBLISH_LOCK_FILE = "publish.lock"
+PUBLISH_LOCK_STALE = 60     # s, verrou laisse par un process mort pendant la publication
+
+
+def bundle_dir(version=ARTIFACT_VERSION):
+    """Racine du bundle (versions publiees + pointeur CURRENT)."""
+    return ARTIFACTS_DIR / f"v{version}"
+
+
+def current_bundle(path=None):
+    """
+    Dossier de la version publiee courante. path : racine du bundle (defaut
+    bundle_dir()) ou dossier de version deja resolu, rendu tel quel.
+    Resoudre une fois puis tout lire dans ce dossier : une publication
+    concurrente ne le modifie pas.
+    """
+    if path is None:
+        path = bundle_dir()
+    try:
+        name = (path / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except (FileNotFoundError, NotADirectoryError):
+        return path
+    return path / name
+
+
+def corpus_fingerprint(articles_df: pd.DataFrame, abstracts=None) -> str:
+    """
+    Empreinte du corpus (ids + texte) et des parametres TF-IDF.
+    Si elle change, le bundle sur disque n'est plus valide.
+    """
+    h = fingerprint_hasher()
+    h.update(fingerprint_rows(articles_df, abstracts))
+    return h.hexdigest()
+
+
+def fingerprint_hasher():
+    h = hashlib.sha1()
+    h.update(repr((TFIDF_MAX_FEATURES, TFIDF_NGRAM_RANGE, TFIDF_STOP_WORDS)).encode())
+    return h
+
+
+def fingerprint_rows(articles_df, abstracts=None):
+    """Hash ligne par ligne : des paquets successifs donnent la meme empreinte que le corpus entier."""
+    hashed = pd.util.hash_pandas_object(
+        pd.DataFrame({"id": articles_df["id"].astype(str), "text": article_texts(articles_df, abstracts)}),
+        index=False,
+    )
+    return hashed.values.tobytes()
+
+
+def save_artifacts(vectorizer, X_tfidf, articles_df, abstracts=None, path=None, fingerprint=None,
+                   keep_existing=False, extra=None):
+    """
+    Ecrit le bundle : vectorizer (joblib), matrice CSR en tableaux bruts (.npy),
+    ids des articles (ordre = lignes de X_tfidf), metadonnees et abstracts
+    (Arrow, fichiers separes) et meta.json.
+    Ecriture dans un dossier temporaire puis publication (publish_bundle) pour
+    ne jamais laisser un bundle a moitie ecrit.
+    keep_existing, extra : cf. publish_bundle.
+    """
+    if path is None:
+        path = bundle_dir()
+    if abstracts is None:
+        abstracts = AbstractStore.from_articles()
+    if fingerprint is None:
+        fingerprint = corpus_fingerprint(articles_df, abstracts)
+
+    X = csr_matrix(X_tfidf)
+    tmp = new_bundle_tmp(path)
+
+    joblib.dump(vectorizer, tmp / VECTORIZER_FILE)
+    np.save(tmp / X_DATA_FILE, X.data)
+    np.save(tmp / X_INDICES_FILE, X.indices)
+    np.save(tmp / X_INDPTR_FILE, X.indptr)
+    np.save(tmp / IDS_FILE, articles_df["id"].astype(str).to_numpy(dtype=str))
+    write_articles_table(articles_df, tmp / ARTICLES_FILE)
+    abstracts.save(tmp / ABSTRACTS_FILE)
+    save_search_structures(tmp, X, articles_df, abstracts)
+    return publish_bundle(tmp, path, fingerprint, X.shape, X.nnz, extra, keep_existing=keep_existing)
+
+
+def new_bundle_tmp(path):
+    """Dossier temporaire dans la racine du bundle, renomme en fin d'ecriture (publish_bundle)."""
+    tmp = path / f".tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    tmp.mkdir(parents=True)
+    return tmp
+
+
+def link_bundle_files(src, tmp, skip=(), only=None):
+    """
+    Fichiers d'une version publiee repris dans un dossier temporaire (sauf
+    meta.json et `skip`, seulement `only` si donne) : liens durs, rien n'est
+    recopie sur disque (les versions publiees ne sont jamais modifiees).
+    """
+    for f in src.iterdir():
+        if f.name == META_FILE or f.name in skip or (only is not None and f.name not in only):
+            continue
+        if f.is_file():
+            try:
+                os.link(f, tmp / f.name)
+            except OSError:
+                shutil.copy2(f, tmp / f.name)
+
+
+def save_search_structures(tmp, X, articles_df, abstracts):
+    """
+    Posting lists (P_*.npy) de X, index BM25 de /api/search (S_*.npy) et
+    corpus tokenise du trend_score (T_*.npy).
+    """
+    index = InvertedIndex.from_matrix(X)
+    np.save(tmp / POSTINGS_INDPTR_FILE, index.indptr)
+    np.save(tmp / POSTINGS_INDICES_FILE, index.indices)
+    np.save(tmp / POSTINGS_DATA_FILE, index.data)
+    np.save(tmp / POSTINGS_MAX_FILE, index.max_scores)
+    SearchIndex.from_articles(articles_df, abstracts).save(tmp)
+    build_token_corpus(articles_df, abstracts).save(tmp)
+
+
+def publish_bundle(tmp, path, fingerprint, shape, nnz, extra=None, keep_existing=False):
+    """
+    Ecrit meta.json puis publie le dossier temporaire comme nouvelle version
+    du bundle `path` (racine) : renommage en dossier de version, puis
+    remplacement atomique du pointeur CURRENT, sous verrou exclusif.
+    Une version publiee n'est jamais reecrite ni supprimee tant qu'elle fait
+    partie des BUNDLE_KEEP plus recentes : les workers qui l'ont memory-mappee
+    continuent a la lire.
+    extra : champs ajoutes a meta.json (ex. derive de l'idf apres ajout incremental).
+    source_fingerprint : empreinte du fichier articles dont derive le bundle
+    (= fingerprint, sauf ajouts incrementaux par-dessus, cf. src.incremental).
+    keep_existing : build de demarrage ; si un autre process a publie entretemps
+    un bundle de meme empreinte, le sien est garde (et son meta.json retourne).
+    """
+    meta = {
+        "version": ARTIFACT_VERSION,
+        "fingerprint": fingerprint,
+        "n_docs": int(shape[0]),
+        "n_features": int(shape[1]),
+        "nnz": int(nnz),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "source_fingerprint": fingerprint,
+        **(extra or {}),
+    }
+    with (tmp / META_FILE).open("w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    with _publish_lock(path):
+        current = load_meta(path)
+        if keep_existing and current is not None and current.get("fingerprint") == fingerprint:
+            print("[INFO] Bundle deja publie par un autre process -> conserve")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return current
+        name = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f") + f"-{os.getpid()}"
+        tmp.rename(path / name)
+        pointer = path / f".{CURRENT_FILE}-{os.getpid()}"
+        pointer.write_text(name, encoding="utf-8")
+        os.replace(pointer, path / CURRENT_FILE)
+        _prune_versions(path, name)
+    return meta
+
+
+@contextmanager
+def _publish_lock(path):
+    """Verrou exclusif (O_EXCL) sur la racine du bundle, le temps de la publication."""
+    lock = path / PUBLISH_LOCK_FILE
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > PUBLISH_LOCK_STALE:
+                    lock.unlink(missing_ok=True)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        lock.unlink(missing_ok=True)
+
+
+def _prune_versions(path, current):
+    """Supprime les versions publiees au-dela des BUNDLE_KEEP plus recentes (jamais la courante)."""
+    versions = sorted(p.name for p in path.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for name in versions[:-BUNDLE_KEEP]:
+        if name != current:
+            # ignore_errors : fichiers encore memory-mappes sous Windows, retente a la prochaine publication
+            shutil.rmtree(path / name, ignore_errors=True)
+
+
+def write_articles_table(articles_df, path):
+    # Arrow IPC non compresse : lisible en memory-map sans copie (jamais l'abstract, cf. ABSTRACTS_FILE)
+    table = pa.Table.from_pandas(articles_df.drop(columns=["abstract"], errors="ignore"), preserve_index=False)
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_articles_arrow(path):
+    table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    # ArrowDtype : les colonnes pandas pointent directement sur le fichier mappe
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def load_meta(path=None):
+    path = current_bundle(path)
+    meta_path = path / META_FILE
+    if not meta_path.exists():
+        return None
+    try:
+        with meta_path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print("Erreur lecture meta artefacts:", e)
+        return None
+
+
+def load_artifacts(path=None, mmap=False):
+    """
+    Charge le bundle. Retourne (vectorizer, X_tfidf, ids, meta) ou None
+    si le bundle est absent ou d'une autre version de format.
+
+    mmap=True : les tableaux CSR sont ouverts en memory-map lecture seule,
+    la matrice n'est pas copiee dans le tas du process.
+    """
+    path = current_bundle(path)
+    meta = load_meta(path)
+    if meta is None or meta.get("version") != ARTIFACT_VERSION:
+        return None
+
+    vectorizer = joblib.load(path / VECTORIZER_FILE)
+    X_tfidf = _load_matrix(path, meta, mmap)
+    ids = np.load(path / IDS_FILE, mmap_mode="r" if mmap else None)
+    return vectorizer, X_tfidf, ids, meta
+
+
+def _load_matrix(path, meta, mmap=False):
+    mmap_mode = "r" if mmap else None
+    return csr_matrix(
+        (
+            np.load(path / X_DATA_FILE, mmap_mode=mmap_mode),
+            np.load(path / X_INDICES_FILE, mmap_mode=mmap_mode),
+            np.load(path / X_INDPTR_FILE, mmap_mode=mmap_mode),
+        ),
+        shape=(meta["n_docs"], meta["n_features"]),
+        copy=False,
+    )
+
+
+def load_matrix(path=None, mmap=False):
+    """Matrice TF-IDF seule (sans vectorizer), ex. pour les workers de scoring. None si absente."""
+    path = current_bundle(path)
+    meta = load_meta(path)
+    if meta is None or meta.get("version") != ARTIFACT_VERSION:
+        return None
+    return _load_matrix(path, meta, mmap)
+
+
+def load_articles_table(path=None):
+    """Metadonnees articles du bundle (Arrow memory-mappe)."""
+    path = current_bundle(path)
+    return _read_articles_arrow(path / ARTICLES_FILE)
+
+
+def load_abstract_store(path=None):
+    """Abstracts du bundle, memory-mappes au premier acces (None si absents)."""
+    path = current_bundle(path)
+    meta = load_meta(path)
+    if meta is None or meta.get("version") != ARTIFACT_VERSION or not (path / ABSTRACTS_FILE).exists():
+        return None
+    return AbstractStore.from_arrow(path / ABSTRACTS_FILE)
+
+
+def load_inverted_index(path=None, mmap=False):
+    """Posting lists du bundle (None si absentes)."""
+    path = current_bundle(path)
+    meta = load_meta(path)
+    if meta is None or meta.get("version") != ARTIFACT_VERSION:
+        return None
+    mmap_mode = "r" if mmap else None
+    return InvertedIndex(
+        np.load(path / POSTINGS_INDPTR_FILE, mmap_mode=mmap_mode),
+        np.load(path / POSTINGS_INDICES_FILE, mmap_mode=mmap_mode),
+        np.load(path / POSTINGS_DATA_FILE, mmap_mode=mmap_mode),
+        np.load(path / POSTINGS_MAX_FILE, mmap_mode=mmap_mode),
+        meta["n_docs"],
+    )
+
+
+def load_search_index(path=None, mmap=False):
+    """Index BM25 du bundle (None si absent)."""
+    path = current_bundle(path)
+    meta = load_meta(path)
+    if meta is None or meta.get("version") != ARTIFACT_VERSION:
+        return None
+    return SearchIndex.load(path, meta["n_docs"], mmap=mmap)
+
+
+def load_token_corpus(path=None, mmap=False):
+    """Corpus tokenise du bundle pour le trend_score (None si absent)."""
+    path = current_bundle(path)
+    meta = load_meta(path)
+    if meta is None or meta.get("version") != ARTIFACT_VERSION:
+        return None
+    return TokenCorpus.load(path, mmap=mmap)
+
+
+def load_shared_artifacts(path=None):
+    """
+    Mode de service "mmap" : articles_df et X_tfidf sont adosses aux fichiers
+    du bundle, partages en lecture seule entre tous les workers.
+    Le bundle est construit depuis le fichier articles s'il n'existe pas encore
+    (workers demarres ensemble : le premier publie, les autres chargent sa version).
+    Retourne (articles_df, abstracts, vectorizer, X_tfidf, path), path : dossier
+    de la version lue, a passer aux autres loaders (index, voisins, ...).
+    """
+    root = bundle_dir() if path is None else path
+    path = current_bundle(root)
+    loaded = load_artifacts(path, mmap=True)
+    if loaded is None:
+        print("[INFO] Pas de bundle d'artefacts -> build avant mise en service")
+        build_artifacts(load_articles(), AbstractStore.from_articles(), path=root, keep_existing=True)
+        path = current_bundle(root)
+        loaded = load_artifacts(path, mmap=True)
+
+    vectorizer, X_tfidf, _, meta = loaded
+    articles_df = _read_articles_arrow(path / ARTICLES_FILE)
+    abstracts = AbstractStore.from_arrow(path / ABSTRACTS_FILE)
+    print(f"[INFO] Artefacts memory-mappes ({meta['n_docs']} docs, {meta['created_at']})")
+    return articles_df, abstracts, vectorizer, X_tfidf, path
+
+
+def load_memory_artifacts(path=None):
+    """
+    Mode de service "memory" : chaque worker charge sa propre copie du modele.
+    Le bundle fait foi tant qu'il derive du fichier articles courant, y compris
+    avec des articles ajoutes par src.incremental (source_fingerprint) : ses
+    metadonnees, abstracts et sa matrice sont servis. Sinon refit sur le
+    fichier articles (load_or_build_artifacts).
+    Fichier articles reecrit ou reordonne apres des ajouts incrementaux : son
+    empreinte ne correspond plus a source_fingerprint, le demarrage (ou le
+    rechargement du snapshot) refait un fit complet sur le fichier seul et
+    les articles ajoutes qui n'y figurent pas ne sont plus servis ([WARN] dans
+    les logs).
+    Retourne (articles_df, abstracts, vectorizer, X_tfidf, path) comme load_shared_artifacts.
+    """
+    root = bundle_dir() if path is None else path
+    # Metadonnees compactes seulement ; l'abstract n'est lu que pour l'empreinte / le fit
+    articles_df = load_articles()
+    abstracts = AbstractStore.from_articles()
+    fingerprint = corpus_fingerprint(articles_df, abstracts)
+    path = current_bundle(root)
+    meta = load_meta(path)
+    appended = meta is not None and meta.get("fingerprint") != fingerprint
+    if appended and meta.get("source_fingerprint") == fingerprint:
+        loaded = load_artifacts(path)
+        if loaded is not None:
+            vectorizer, X_tfidf, _, meta = loaded
+            print(f"[INFO] Artefacts charges ({meta['n_docs']} docs avec ajouts incrementaux, {meta['created_at']})")
+            return load_articles_table(path), load_abstract_store(path), vectorizer, X_tfidf, path
+    elif appended and meta.get("source_fingerprint"):
+        # fichier articles reecrit / reordonne depuis les ajouts : ils ne peuvent pas etre rejoues
+        print(f"[WARN] Fichier articles modifie depuis le build du bundle avec ajouts incrementaux "
+              f"({meta['n_docs']} docs) -> refit complet sur les {len(articles_df)} articles du fichier, "
+              f"les articles ajoutes absents du fichier ne sont plus servis")
+
+    vectorizer, X_tfidf, path = load_or_build_artifacts(articles_df, abstracts, root, fingerprint)
+    # Abstracts servis depuis le bundle (memory-map) : la colonne lue ci-dessus est liberee
+    abstracts = (load_abstract_store(path) if path else None) or abstracts
+    return articles_df, abstracts, vectorizer, X_tfidf, path
+
+
+def build_artifacts(articles_df, abstracts=None, path=None, keep_existing=False, extra=None):
+    """Fit TF-IDF sur le corpus et ecrit le bundle."""
+    if abstracts is None:
+        abstracts = AbstractStore.from_articles()
+    # texte concatene le temps du fit seulement
+    vectorizer, X_tfidf = fit_vectorizer(article_texts(articles_df, abstracts))
+    meta = save_artifacts(
+        vectorizer, X_tfidf, articles_df, abstracts, path=path, keep_existing=keep_existing, extra=extra
+    )
+    return vectorizer, X_tfidf, meta
+
+
+def load_or_build_artifacts(articles_df, abstracts=None, path=None, fingerprint=None):
+    """
+    Chemin de demarrage de l'API :
+      1) bundle present et empreinte identique -> chargement (quelques secondes)
+      2) sinon -> fit complet puis ecriture du bundle pour les prochains demarrages
+    Retourne (vectorizer, X_tfidf, path), path : dossier de la version du bundle
+    qui correspond au modele, None si l'ecriture a echoue.
+    """
+    if abstracts is None:
+        abstracts = AbstractStore.from_articles()
+    root = bundle_dir() if path is None else path
+    if fingerprint is None:
+        fingerprint = corpus_fingerprint(articles_df, abstracts)
+    path = current_bundle(root)
+    loaded = load_artifacts(path)
+    if loaded is not None:
+        vectorizer, X_tfidf, ids, meta = loaded
+        if meta.get("fingerprint") == fingerprint:
+            print(f"[INFO] Artefacts charges ({meta['n_docs']} docs, {meta['created_at']})")
+            return vectorizer, X_tfidf, path
+        print("[WARN] Empreinte du corpus differente -> refit TF-IDF")
+    else:
+        print("[INFO] Pas de bundle d'artefacts -> fit TF-IDF")
+
+    vectorizer, X_tfidf = fit_vectorizer(article_texts(articles_df, abstracts))
+    try:
+        save_artifacts(vectorizer, X_tfidf, articles_df, abstracts, path=root, fingerprint=fingerprint,
+                       keep_existing=True)
+    except Exception as e:
+        # pas bloquant : on sert quand meme avec le modele en memoire
+        print("Erreur ecriture artefacts:", e)
+        return vectorizer, X_tfidf, None
+    path = current_bundle(root)
+    if (load_meta(path) or {}).get("fingerprint") != fingerprint:
+        # republie entretemps par un autre process
+        return vectorizer, X_tfidf, None
+    return vectorizer, X_tfidf, path
+
+
+if __name__ == "__main__":
+    # Etape de build : python -m src.artifacts
+    df = load_articles()
+    _, X, meta = build_artifacts(df, AbstractStore.from_articles())
+    print(f"Bundle ecrit dans {bundle_dir()} : {meta['n_docs']} docs x {meta['n_features']} features")
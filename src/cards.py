@@ -0,0 +1,102 @@
+import json
+import math
+import numpy as np
+import pandas as pd
+from src.data_loading import article_abstracts
+from src.utils import get_article_image
+
+CARD_FIELDS = ["id", "title", "author", "field", "year", "url"]
+CARD_ABSTRACT_CHARS = 300   # les cartes n'affichent que 3 lignes d'abstract
+
+
+def _clean(value):
+    """Valeur pandas/numpy -> type JSON natif (NaN -> None)."""
+    if value is None or value is pd.NA:
+        return None
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    return value
+
+
+def _truncate(text, n=CARD_ABSTRACT_CHARS):
+    if not isinstance(text, str) or len(text) <= n:
+        return text
+    cut = text[:n].rsplit(" ", 1)[0]
+    return cut + "..."
+
+
+class CardStore:
+    """
+    Cartes article precalculees, une fois par version du corpus :
+    id, title, author, field, year, url, image_url + debut de l'abstract.
+
+    Une carte n'est gardee qu'une fois, en JSON deja encode sans l'accolade
+    fermante : les endpoints JSON assemblent la reponse par concatenation en
+    ajoutant seulement le score (pas de to_dict pandas ni de boucle par ligne).
+    Tous les fragments sont dans un seul buffer (bytes) + offsets, pas un
+    objet Python par carte. Les templates HTML (quelques cartes par page)
+    redecodent leurs cartes en dicts (records).
+    """
+
+    def __init__(self, articles_df, abstracts=None):
+        columns = {
+            f: articles_df[f].tolist() if f in articles_df.columns else [None] * len(articles_df)
+            for f in CARD_FIELDS
+        }
+        # l'abstract complet reste dans l'AbstractStore, la carte n'en garde que le debut
+        columns["abstract"] = article_abstracts(articles_df, abstracts).tolist()
+        fragments = []
+        for row in range(len(articles_df)):
+            card = {f: _clean(columns[f][row]) for f in CARD_FIELDS}
+            if card["id"] is not None:
+                card["id"] = str(card["id"])
+            if card["year"] is not None:
+                card["year"] = int(card["year"])
+            card["image_url"] = get_article_image(card["field"])
+            card["abstract"] = _truncate(_clean(columns["abstract"][row]))
+            fragments.append(json.dumps(card, ensure_ascii=False)[:-1].encode("utf-8"))
+        self._offsets = np.zeros(len(fragments) + 1, dtype=np.int64)
+        np.cumsum([len(f) for f in fragments], out=self._offsets[1:])
+        self._buffer = b"".join(fragments)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def fragment(self, row):
+        """JSON encode de la carte, sans l'accolade fermante."""
+        return self._buffer[self._offsets[row]:self._offsets[row + 1]]
+
+    def records(self, rows, scores=None, columns=None):
+        """Cartes (dicts) des lignes, avec score et colonnes supplementaires."""
+        records = []
+        for i, row in enumerate(rows):
+            card = json.loads(self.fragment(row) + b"}")
+            if scores is not None:
+                card["score"] = _clean(scores[i])
+            for name, col in (columns or {}).items():
+                card[name] = _clean(col[i])
+            records.append(card)
+        return records
+
+    def json_list(self, rows, scores=None, columns=None):
+        """Reponse JSON (bytes) : liste des cartes, score et colonnes colles a chaque fragment."""
+        extras = {}
+        if scores is not None:
+            extras["score"] = scores
+        extras.update(columns or {})
+        # une seule serialisation par colonne supplementaire (floats -> JSON)
+        encoded = [(name, [_encode_number(v) for v in np.asarray(col).tolist()]) for name, col in extras.items()]
+
+        parts = []
+        for i, row in enumerate(rows):
+            tail = b"".join(b',"' + name.encode() + b'":' + values[i] for name, values in encoded)
+            parts.append(self.fragment(row) + tail + b"}")
+        return b"[" + b",".join(parts) + b"]"
+
+
+def _encode_number(value):
+    if value is None or (isinstance(value, float) and not math.isfinite(value)):
+        return b"null"
+    return repr(value).encode()
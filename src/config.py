@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Racine du projet
@@ -5,16 +6,19 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
 # API
 ARXIV_API_URL = "https://export.arxiv.org/api/query"
+TRENDS_REFRESH_INTERVAL = 3600   # secondes entre deux rafraichissements des tendances (tache de fond)
 
 # Dossiers de donnees
 DATA_DIR = PROJECT_ROOT / "data"
 
 # Cache
 DATA_CACHE_DIR = DATA_DIR / "cache"
+TERM_STATS_PATH = DATA_CACHE_DIR / "term_stats.parquet"   # comptes (year, field, term) du corpus
 
 # Fichiers de donnees
 ARTICLES_PATH = DATA_DIR / "articles_sample.csv" # for tests (test avec petit dataset - partition du big df)
 # ARTICLES_PATH = DATA_DIR / "articles.csv"
+# ARTICLES_PATH = DATA_DIR / "articles.parquet"   # sortie de data/collect_articles.py, lecture colonnaire
 PROFILE_KEYWORDS_PATH = DATA_DIR / "profile_keywords.csv"
 
 # Dossier pour les modeles sauvegardes
@@ -24,16 +28,76 @@ LLM_URL = "sentence-transformers/all-MiniLM-L6-v2"  # modèle de sentence-transf
 # This is a sentence-transformers model: It maps sentences & paragraphs to a 384 dimensional dense vector space and can be used for tasks like clustering or semantic search.
 EMB_PATH = "models/article_embeddings.npy"
 
+# Bundle d'artefacts (vectorizer + matrice TF-IDF + mapping id -> ligne)
+ARTIFACTS_DIR = MODELS_DIR / "artifacts"
+ARTIFACT_VERSION = 8        # a incrementer si le format du bundle change
+BUNDLE_KEEP = 3             # versions publiees gardees dans le bundle (workers encore sur l'ancienne)
+
 # Parametres TF-IDF
 TFIDF_MAX_FEATURES = 500000
 TFIDF_NGRAM_RANGE = (1, 2)
 TFIDF_STOP_WORDS = "english"
+TFIDF_STREAM_BATCH = 20000  # articles par paquet pour le fit hors memoire (python -m src.streaming_fit)
+TFIDF_N_JOBS = -1           # processus pour le fit (tokenisation + comptes par shard), -1 = tous les coeurs
+TFIDF_SHARD_MIN_DOCS = 5000 # documents min par shard : en dessous, fit sklearn en un seul processus
+TFIDF_DRIFT_MAX = 0.02      # derive relative de l'idf toleree par l'ajout incremental, au-dela : refit complet
 
 # Parametres de recommandation
 TOP_K_MAIN    = 10          # nb d'articles recommandé principalement
 TOP_K_SIMILAR = 10          # nb d'articles similaires à proposer
 PROFILE_ALPHA = 0.6         # 60% profil initial + 40% likes
 RANDOM_SEED   = 42
+PROFILE_BATCH_CHUNK = 64    # profils scores ensemble par produit matriciel (memoire ~ chunk x n_articles)
+USE_INVERTED_INDEX = True   # top-k profil via posting lists (MaxScore) au lieu d'un produit sur tout le corpus
+# Profils de session (likes incrementaux cote serveur)
+SESSION_MAX = 10000                 # sessions gardees en memoire (LRU)
+SESSION_TTL = 24 * 3600             # secondes d'inactivite avant expiration
+SESSION_SPILL_DIR = None            # ex: DATA_CACHE_DIR / "sessions" pour garder les sessions chassees sur disque
+# Sessions partagees entre workers uvicorn (--workers N) : un fichier par session, reecrit a chaque like.
+# None = sessions propres a chaque processus (un seul worker, ou affinite de session au load balancer)
+SESSION_SHARED_DIR = None           # ex: DATA_CACHE_DIR / "sessions_shared"
+# Cache des recos par jeu de tags / preferences (vecteur de profil + classement)
+RESULT_CACHE_MAX = 2048             # entrees par niveau (LRU)
+RESULT_CACHE_TTL = 600              # secondes
+# Pagination par curseur (scroll infini) : la suite de la liste est dans le curseur signe
+PAGE_CANDIDATES = 200               # profondeur calculee une fois par liste
+CURSOR_TTL = 1800                   # secondes de validite d'une liste, emise par fenetres de CURSOR_TTL / 2
+CURSOR_SECRET = os.environ.get("CURSOR_SECRET")  # cle HMAC des curseurs, commune a tous les workers / serveurs
+CURSOR_KEY_PATH = DATA_CACHE_DIR / "cursor.key"  # cle generee au premier demarrage si CURSOR_SECRET absent
+
+# Table de voisins article -> article (job offline : python -m src.neighbors)
+NEIGHBORS_K = 50                  # voisins stockes par article
+NEIGHBORS_BLOCK_MEMORY_MB = 256   # taille max d'un bloc de similarites dense (par worker)
+NEIGHBORS_N_JOBS = -1             # -1 = tous les coeurs
+
+# Recherche plein texte (/api/search) : BM25 sur plusieurs champs
+SEARCH_FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "field": 1.5, "abstract": 1.0}
+SEARCH_BM25_K1 = 1.2
+SEARCH_BM25_B = 0.75
+SEARCH_PREFIX_EXPANSIONS = 50     # termes max pour completer le dernier mot tape
+
+# Mode de service de l'API :
+#   "memory" -> chaque worker charge sa propre copie (comportement historique)
+#   "mmap"   -> matrice CSR + metadonnees memory-mappees en lecture seule depuis le bundle,
+#               les workers uvicorn partagent les memes pages (page cache de l'OS)
+SERVING_MODE = "memory"
+# Execution du scoring dans l'API :
+#   "threads" -> calcul dans le threadpool de Starlette (comportement historique)
+#   "pool"    -> pool de processus attaches au bundle memory-mappe, requetes profil
+#                concurrentes regroupees en un seul produit matriciel (micro-batch)
+EXECUTION_MODE = "threads"
+SCORING_WORKERS = 4             # processus de scoring
+SCORING_MAX_PENDING = 256       # requetes en attente max avant de repondre 503 (backpressure)
+MICROBATCH_WINDOW_MS = 2        # attente max pour regrouper des requetes profil
+MICROBATCH_MAX = 64             # profils max par micro-batch
+# Cache HTTP (ETag + Cache-Control) des endpoints stables
+HTTP_CACHE_MAX = 4096               # corps de reponse gardes en memoire (LRU)
+HTTP_MAX_AGE_TAGS = 3600            # secondes (Cache-Control max-age)
+HTTP_MAX_AGE_HOT = 300
+HTTP_MAX_AGE_SIMILAR = 3600
+# Rechargement a chaud des snapshots (corpus + modele) dans l'API
+SNAPSHOT_WATCH_INTERVAL = 30        # secondes entre deux lectures de meta.json, None = pas de surveillance
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")  # header X-Admin-Token de POST /admin/reload, None = desactive
 
 # Parametres de collecte OpenAlex
 # Cible totale par catégorie
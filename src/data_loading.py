@@ -1,15 +1,216 @@
+import hashlib
+import threading
+from pathlib import Path
+import numpy as np
 import pandas as pd
-from src.config import ARTICLES_PATH, PROFILE_KEYWORDS_PATH
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.config import ARTICLES_PATH, PROFILE_KEYWORDS_PATH, TFIDF_STREAM_BATCH
 
-def load_articles(path=None):
+# Colonnes gardees en memoire pour servir l'API (l'abstract est a part : AbstractStore)
+ARTICLE_COLUMNS = ["id", "title", "author", "field", "year", "url", "journal", "cite_nb"]
+# Lignes sans ces colonnes ignorees
+REQUIRED_COLUMNS = ["title", "abstract", "field"]
+# Peu de valeurs distinctes -> dictionnaire (codes entiers + une copie de chaque valeur)
+CATEGORY_COLUMNS = ["field", "journal"]
+# Entiers etroits (annee sur 2 octets, citations sur 4)
+INT_COLUMNS = {"year": "int16", "cite_nb": "int32"}
+
+
+def _read_articles(path, columns):
+    """
+    Lecture colonnaire (Parquet) ou CSV, limitee a `columns` + colonnes obligatoires.
+    Les lignes incompletes sont ecartees ici : tous les lecteurs voient les memes lignes.
+    """
+    path = Path(path)
+    wanted = list(dict.fromkeys(columns + REQUIRED_COLUMNS))
+    if path.suffix == ".parquet":
+        available = pq.read_schema(path).names
+        table = pq.read_table(
+            path,
+            columns=[c for c in wanted if c in available],
+            read_dictionary=[c for c in CATEGORY_COLUMNS if c in wanted and c in available],
+        )
+        df = table.to_pandas()
+    else:
+        available = pd.read_csv(path, nrows=0).columns
+        df = pd.read_csv(
+            path,
+            usecols=[c for c in wanted if c in available],
+            dtype={c: "category" for c in CATEGORY_COLUMNS if c in wanted and c in available},
+        )
+    return _select(df, columns)
+
+
+def _select(df, columns):
+    df = df.dropna(subset=REQUIRED_COLUMNS).reset_index(drop=True)
+    return df[[c for c in columns if c in df.columns]]
+
+
+def _narrow_int(s, dtype):
+    s = pd.to_numeric(s, errors="coerce")
+    if s.isna().any():
+        # entier nullable ("Int16" / "Int32") plutot que float64
+        return s.astype(dtype.capitalize())
+    return s.astype(dtype)
+
+
+def _compact_types(df):
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col, dtype in INT_COLUMNS.items():
+        if col in df.columns:
+            df[col] = _narrow_int(df[col], dtype)
+    return df
+
+
+def load_articles(path=None, columns=None):
+    """
+    Metadonnees des articles, en types compacts : field / journal en category,
+    year / cite_nb en entiers etroits. Ni abstract ni texte concatene : le
+    texte est construit a la demande (article_texts), l'abstract vit dans un
+    AbstractStore.
+
+    path : .parquet (sortie de data/collect_articles.py, lecture des seules
+           colonnes utiles) ou .csv
+    columns : projection (defaut ARTICLE_COLUMNS)
+    """
     if path is None:
         path = ARTICLES_PATH
-    df = pd.read_csv(path, low_memory=False)
-    df = df.dropna(subset=["title", "abstract", "field"]).reset_index(drop=True)
-    df["text"] = df["title"] + " " + df["abstract"] + " " + df["field"]
-    return df
+    if columns is None:
+        columns = ARTICLE_COLUMNS
+    return _compact_types(_read_articles(path, columns))
+
+
+def iter_articles(path=None, columns=None, batch_size=TFIDF_STREAM_BATCH):
+    """
+    Memes lignes et memes types que load_articles, par paquets de batch_size
+    lignes lues (record batches Parquet, chunks CSV) : la memoire ne depend
+    pas de la taille du corpus. Index de chaque paquet = numero de ligne global.
+    """
+    if path is None:
+        path = ARTICLES_PATH
+    if columns is None:
+        columns = ARTICLE_COLUMNS
+    path = Path(path)
+    wanted = list(dict.fromkeys(columns + REQUIRED_COLUMNS))
+    if path.suffix == ".parquet":
+        parquet = pq.ParquetFile(path)
+        available = parquet.schema_arrow.names
+        chunks = (
+            batch.to_pandas()
+            for batch in parquet.iter_batches(batch_size=batch_size, columns=[c for c in wanted if c in available])
+        )
+    else:
+        available = pd.read_csv(path, nrows=0).columns
+        chunks = pd.read_csv(path, usecols=[c for c in wanted if c in available], chunksize=batch_size)
+
+    offset = 0
+    for chunk in chunks:
+        df = _compact_types(_select(chunk, columns))
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        offset += len(df)
+        if len(df):
+            yield df
+
+
+class AbstractStore:
+    """
+    Abstracts des articles, hors du DataFrame principal et charges au premier acces.
+    Ligne i = ligne i de articles_df (index de load_articles).
+
+    - from_arrow : colonne Arrow du bundle en memory-map, seules les pages lues
+      (page article, filtre de phrases) passent en RAM
+    - from_articles : colonne abstract du fichier source, lue au premier besoin
+      (build du bundle) ; release() la rend
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._column = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_articles(cls, path=None):
+        if path is None:
+            path = ARTICLES_PATH
+
+        def load():
+            abstracts = _read_articles(path, ["abstract"])["abstract"]
+            return pa.chunked_array([pa.array(abstracts.to_numpy(dtype=object), type=pa.large_string())])
+
+        return cls(load)
+
+    @classmethod
+    def from_arrow(cls, path):
+        return cls(lambda: pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all().column("abstract"))
+
+    def column(self):
+        if self._column is None:
+            with self._lock:
+                if self._column is None:
+                    self._column = self._loader()
+        return self._column
+
+    def __len__(self):
+        return len(self.column())
+
+    def get(self, row):
+        return self.column()[int(row)].as_py()
+
+    def take(self, rows):
+        """Abstracts (list de str) des lignes demandees."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return self.column().take(pa.array(rows)).to_pylist()
+
+    def series(self, index=None):
+        """Colonne complete en pandas (transitoire : build du bundle, de l'index de recherche, ...)."""
+        if index is None:
+            return pd.Series(self.column().to_pylist())
+        index = pd.Index(index)
+        return pd.Series(self.take(index.to_numpy()), index=index)
+
+    def save(self, path):
+        # Arrow IPC non compresse : relu en memory-map par from_arrow
+        table = pa.table({"abstract": self.column()})
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    def release(self):
+        with self._lock:
+            self._column = None
+
+
+def article_abstracts(articles_df, abstracts=None):
+    """Abstracts alignes sur articles_df (sous-ensemble possible : lignes = index)."""
+    if abstracts is not None:
+        return abstracts.series(articles_df.index)
+    if "abstract" in articles_df.columns:
+        return articles_df["abstract"]
+    return pd.Series("", index=articles_df.index)
+
+
+def article_texts(articles_df, abstracts=None, with_field=True):
+    """
+    Texte title + abstract (+ field) construit a la demande, pour le fit TF-IDF
+    et la tokenisation ; jamais garde comme colonne.
+    """
+    texts = articles_df["title"].astype(str) + " " + article_abstracts(articles_df, abstracts).astype(str)
+    if with_field:
+        texts = texts + " " + articles_df["field"].astype(str)
+    return texts
+
 
 def load_profile_keywords(path=None):
     if path is None:
         path = PROFILE_KEYWORDS_PATH
     return pd.read_csv(path)
+
+
+def profile_keywords_version(profile_kw_df):
+    """Empreinte du contenu des mots-cles de profil (colonnes + valeurs), pour les ETags de /api/tags."""
+    h = hashlib.sha1(repr(list(profile_kw_df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(profile_kw_df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
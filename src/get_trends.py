@@ -1,4 +1,3 @@
-import re
 import requests
 import json
 import pandas as pd
@@ -7,37 +6,37 @@ from datetime import datetime, timedelta
 from xml.etree import ElementTree as ET
 from pathlib import Path
 from src.config import ARXIV_API_URL, DATA_CACHE_DIR
-from nltk.corpus import stopwords
-
-def simple_tokenize(text: str) -> list[str]:
-    text = text.lower()
-    # virer ce qui n'est pas str
-    text = re.sub(r"[^a-zA-Z0-9\s]", " ", text)
-    tokens = text.split()
-    # mots vides minimalistes
-    sw = stopwords.words("english")
-    tokens = [t for t in tokens if len(t) > 3 and t not in sw]
-    return tokens
+from src.data_loading import article_texts
+from src.term_stats import simple_tokenize, top_terms
 
 
 def get_trends_from_corpus(
     articles_df: pd.DataFrame,
     n_terms: int = 10,
     recent_years: int = 3,
+    term_stats: pd.DataFrame = None,
+    field=None,
+    abstracts=None,
 ) -> list[str]:
     """
     Extrait des 'mots tendances' a partir des articles les plus recents.
+    Avec term_stats (table (year, field, term) construite a l'ingestion),
+    c'est une agregation de comptes deja calcules, sans rescanner le corpus.
+    abstracts : AbstractStore (seuls les abstracts des articles recents sont lus).
     """
-    df = articles_df.copy()
+    if term_stats is not None:
+        return top_terms(term_stats, n_terms=n_terms, recent_years=recent_years, field=field)
+
+    df = articles_df
+    if field is not None:
+        df = df[df["field"] == field]
     max_year = df["year"].max()
     cutoff = max_year - recent_years + 1
 
     recent = df[df["year"] >= cutoff]
-    if "text" not in recent.columns:
-        recent["text"] = recent["title"] + " " + recent["abstract"]
 
     counter = Counter()
-    for txt in recent["text"]:
+    for txt in article_texts(recent, abstracts):
         counter.update(simple_tokenize(str(txt)))
 
     # top n terms les plus frequents
@@ -72,8 +71,21 @@ def _get_cache_path_for_previous_week() -> Path:
     DATA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
     return DATA_CACHE_DIR / cache_trend_name
 
-def _load_trends_from_cache() -> list[str]:
+def get_trends_version():
+    """
+    Version du jeu de tendances de la semaine : nom du fichier cache + date de
+    modification. None si le cache de la semaine n'existe pas encore.
+    Ne lit pas le fichier (utilisable a chaque requete).
+    """
     path = _get_cache_path_for_previous_week()
+    try:
+        return f"{path.name}:{path.stat().st_mtime_ns}"
+    except OSError:
+        return None
+
+def _load_trends_from_cache(path: Path = None) -> list[str]:
+    if path is None:
+        path = _get_cache_path_for_previous_week()
     if path.exists():
         try:
             with path.open("r", encoding="utf-8") as f:
@@ -86,6 +98,12 @@ def _load_trends_from_cache() -> list[str]:
     return []
 
 
+def _latest_cache_path():
+    """Fichier de tendances le plus recent du cache (semaine courante ou precedentes), ou None."""
+    paths = sorted(DATA_CACHE_DIR.glob("arxiv_trends_*.json"), key=lambda p: p.stat().st_mtime)
+    return paths[-1] if paths else None
+
+
 def _save_trends_to_cache(trends: list[str]) -> None:
     path = _get_cache_path_for_previous_week()
     try:
@@ -96,7 +114,7 @@ def _save_trends_to_cache(trends: list[str]) -> None:
         print("Erreur ecriture cache tendances:", e)
 
 
-def get_trending_from_arxiv(max_results=10):
+def get_trending_from_arxiv(max_results=10, api_url=ARXIV_API_URL):
     """
     Retourne une liste de titres (ou keywords) d'articles recents sur arXiv.
 
@@ -117,7 +135,7 @@ def get_trending_from_arxiv(max_results=10):
     }
 
     try:
-        response = requests.get(ARXIV_API_URL, params=params, timeout=10)
+        response = requests.get(api_url, params=params, timeout=10)
         response.raise_for_status()
 
         root = ET.fromstring(response.content)
@@ -139,7 +157,7 @@ def get_trending_from_arxiv(max_results=10):
         return []
 
 
-def get_hot_terms(articles_df: pd.DataFrame, top_n=10) -> list[str]:
+def get_hot_terms(articles_df: pd.DataFrame, top_n=10, term_stats=None, abstracts=None) -> list[str]:
     """
     Ordre:
       1) on essaie de charger depuis le cache du jour
@@ -162,14 +180,17 @@ def get_hot_terms(articles_df: pd.DataFrame, top_n=10) -> list[str]:
 
     # 3. Fallback corpus
     print("[WARN] arxiv indisponible -> trends corpus (non mis en cache)")
-    return get_trends_from_corpus(articles_df, n_terms=top_n, recent_years=3)
+    return get_trends_from_corpus(
+        articles_df, n_terms=top_n, recent_years=3, term_stats=term_stats, abstracts=abstracts
+    )
 
 
 if __name__ == "__main__":
     # petit test manuel
     from src.data_loading import load_articles
+    from src.data_loading import AbstractStore
     df = load_articles()
-    terms = get_hot_terms(df, top_n=10)
+    terms = get_hot_terms(df, top_n=10, abstracts=AbstractStore.from_articles())
     print("HOT TERMS:")
     for t in terms:
         print(" -", t)
@@ -0,0 +1,43 @@
+import hashlib
+from src.cache import LRUCache
+from src.config import HTTP_CACHE_MAX
+
+
+def make_etag(*parts):
+    """ETag fort derive de la version (corpus / modele / trends) et de la cle de la ressource."""
+    return '"' + hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match (liste d'ETags, eventuellement faibles, ou *) correspond-il a etag ?"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Corps de reponse deja encodes pour les endpoints stables (tags, hot, similar).
+    Cle = (version, ressource) : une nouvelle version ne retrouve jamais les
+    anciennes entrees, qui sortent de la LRU d'elles-memes.
+    Valeur = (body, headers).
+    """
+
+    def __init__(self, maxsize=HTTP_CACHE_MAX):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get(self, version, key):
+        return self._cache.get((version, key))
+
+    def set(self, version, key, body, headers=None):
+        self._cache.set((version, key), (body, headers or {}))
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from scipy.sparse import vstack
+from src.artifacts import (
+    ABSTRACTS_FILE, ARTICLES_FILE, IDS_FILE, VECTORIZER_FILE,
+    X_DATA_FILE, X_INDICES_FILE, X_INDPTR_FILE,
+    build_artifacts, bundle_dir, corpus_fingerprint, current_bundle, link_bundle_files, load_artifacts,
+    new_bundle_tmp, publish_bundle, save_search_structures, write_articles_table,
+)
+from src.config import ARTICLES_PATH, TERM_STATS_PATH, TFIDF_DRIFT_MAX
+from src.data_loading import AbstractStore, article_abstracts, article_texts, load_articles
+from src.neighbors import NEIGHBORS_IDX_FILE, NEIGHBORS_SCORES_FILE
+from src.term_stats import build_term_stats, load_term_stats, save_term_stats, update_term_stats
+from src.text_vectorizer import compact_matrix
+
+
+def idf_drift(vectorizer, X_tfidf):
+    """
+    Derive de l'idf : ecart moyen entre l'idf fige au dernier fit et l'idf
+    qu'aurait un fit sur les lignes actuelles de X, relatif a l'idf moyen.
+    df d'un terme = nb de valeurs non nulles de sa colonne (idf >= 1 : un
+    terme present a toujours un poids non nul). 0 juste apres un fit complet.
+    """
+    n_docs, n_features = X_tfidf.shape
+    smooth = int(vectorizer.params["smooth_idf"])
+    df = np.bincount(np.asarray(X_tfidf.indices), minlength=n_features)
+    idf = np.log((n_docs + smooth) / (df + smooth)) + 1
+    frozen = vectorizer.idf_.astype(np.float64)
+    return float(np.abs(idf - frozen).mean() / frozen.mean())
+
+
+def append_articles(new_df, new_abstracts=None, path=None, max_drift=TFIDF_DRIFT_MAX):
+    """
+    Ajoute des articles au bundle sans refit :
+      1) articles deja presents (meme id) ignores
+      2) transform des nouveaux textes avec le vocabulaire et l'idf du bundle,
+         lignes ajoutees a la fin de X, des ids, des metadonnees et des abstracts
+      3) derive de l'idf (idf_drift) : au-dela de max_drift, refit complet sur
+         le corpus entier (vocabulaire et idf a jour), sinon le vectorizer reste fige
+    Posting lists et index BM25 sont reconstruits (df et longueurs globaux).
+    Table de voisins reprise telle quelle : elle couvre les anciennes lignes,
+    les nouvelles sont calculees a la volee (lookup_neighbors) jusqu'au
+    prochain python -m src.neighbors.
+    Le bundle garde l'empreinte du fichier source dont il derive
+    (source_fingerprint) : en mode "memory", l'API sert le bundle avec les
+    ajouts au redemarrage (load_memory_artifacts) au lieu de refitter sur le
+    fichier source.
+
+    new_abstracts : AbstractStore aligne sur new_df si new_df n'a pas de colonne abstract.
+    Retourne le meta.json du bundle ecrit (inchange si rien a ajouter).
+    """
+    if path is None:
+        path = bundle_dir()
+    # version lue : fixee une fois, une publication concurrente ne la modifie pas
+    src = current_bundle(path)
+    loaded = load_artifacts(src, mmap=True)
+    if loaded is None:
+        raise FileNotFoundError(f"Pas de bundle d'artefacts dans {path} : lancer d'abord python -m src.artifacts")
+    vectorizer, X_old, ids, meta = loaded
+
+    new_ids = new_df["id"].astype(str).to_numpy()
+    new_df = new_df[~np.isin(new_ids, ids)]
+    if new_df.empty:
+        print("[INFO] Aucun nouvel article")
+        return meta
+
+    articles_df = _concat_articles(src, new_df)
+    abstracts = _concat_abstracts(src, X_old.shape[0], new_df, new_abstracts)
+    texts = article_texts(new_df, new_abstracts)
+    X_new = vectorizer.transform(texts)
+    X = compact_matrix(vstack([X_old, X_new], format="csr"))
+
+    drift = idf_drift(vectorizer, X)
+    old_fingerprint = meta["fingerprint"]
+    fit_n_docs = meta.get("fit_n_docs", meta["n_docs"])
+    source = {"source_fingerprint": meta.get("source_fingerprint", meta["fingerprint"])}
+    print(f"[INFO] {len(new_df)} nouveaux articles, derive idf {drift:.4f} (fit sur {fit_n_docs} docs)")
+    if drift > max_drift:
+        print(f"[INFO] Derive > {max_drift} -> refit TF-IDF complet")
+        _, _, meta = build_artifacts(articles_df, abstracts, path=path, extra=source)
+    else:
+        meta = _write_appended(src, path, meta, X, ids, new_df, articles_df, abstracts,
+                               {**source, "fit_n_docs": fit_n_docs, "idf_drift": drift})
+
+    # comptes de termes (tendances) : seulement les nouveaux articles, si la
+    # table correspond au bundle lu ; table d'un autre corpus -> recomptee en entier
+    stats = load_term_stats(fingerprint=old_fingerprint)
+    if stats is not None:
+        save_term_stats(update_term_stats(stats, new_df, new_abstracts), fingerprint=meta["fingerprint"])
+    elif TERM_STATS_PATH.exists():
+        save_term_stats(build_term_stats(articles_df, abstracts), fingerprint=meta["fingerprint"])
+    return meta
+
+
+def _write_appended(src, path, meta, X, ids, new_df, articles_df, abstracts, extra):
+    tmp = new_bundle_tmp(path)
+    # vectorizer fige et table de voisins des anciennes lignes : repris de la version lue
+    link_bundle_files(src, tmp, only=(VECTORIZER_FILE, NEIGHBORS_IDX_FILE, NEIGHBORS_SCORES_FILE))
+    np.save(tmp / X_DATA_FILE, X.data)
+    np.save(tmp / X_INDICES_FILE, X.indices)
+    np.save(tmp / X_INDPTR_FILE, X.indptr)
+    np.save(tmp / IDS_FILE, np.concatenate([ids, new_df["id"].astype(str).to_numpy(dtype=str)]))
+    write_articles_table(articles_df, tmp / ARTICLES_FILE)
+    abstracts.save(tmp / ABSTRACTS_FILE)
+    save_search_structures(tmp, X, articles_df, abstracts)
+    fingerprint = corpus_fingerprint(articles_df, abstracts)
+    if "neighbors" in meta and meta["neighbors"].get("fingerprint") == meta["fingerprint"]:
+        # lignes 0..n_docs-1 inchangees : la table reste valable pour elles
+        extra["neighbors"] = {**meta["neighbors"], "fingerprint": fingerprint}
+    return publish_bundle(tmp, path, fingerprint, X.shape, X.nnz, extra)
+
+
+def _concat_articles(path, new_df):
+    """Metadonnees du bundle + nouvelles lignes, au schema du bundle (pandas adosse a Arrow)."""
+    old = pa.ipc.open_file(pa.memory_map(str(path / ARTICLES_FILE), "r")).read_all()
+    new = pa.Table.from_pandas(new_df[old.column_names], preserve_index=False).cast(old.schema)
+    # un seul dictionnaire par colonne (field, journal) : exige par le format IPC fichier
+    table = pa.concat_tables([old, new]).unify_dictionaries().combine_chunks()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _concat_abstracts(path, n_docs, new_df, new_abstracts):
+    old = AbstractStore.from_arrow(path / ABSTRACTS_FILE).column().slice(0, n_docs)
+    new = pa.array(article_abstracts(new_df, new_abstracts).to_numpy(dtype=object), type=old.type)
+    column = pa.chunked_array(old.chunks + [new])
+    return AbstractStore(lambda: column)
+
+
+if __name__ == "__main__":
+    # Ingestion quotidienne : python -m src.incremental [chemin .parquet / .csv]
+    # (fichier source complet ou nouveaux articles seulement : les ids deja indexes sont ignores)
+    import sys
+    source = sys.argv[1] if len(sys.argv) > 1 else ARTICLES_PATH
+    meta = append_articles(load_articles(source), AbstractStore.from_articles(source))
+    print(f"Bundle ecrit dans {bundle_dir()} : {meta['n_docs']} docs x {meta['n_features']} features")
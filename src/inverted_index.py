@@ -0,0 +1,129 @@
+import numpy as np
+from scipy.sparse import csr_matrix, csc_matrix
+from sklearn.metrics.pairwise import linear_kernel
+from src.retrieval import top_k as select_top_k
+
+
+class InvertedIndex:
+    """
+    Vue "posting lists" de X_tfidf (format CSC : pour chaque terme, les articles
+    qui le contiennent, tries par numero de ligne) + borne max par terme.
+
+    search() fait un top-k exact type MaxScore : les termes de la requete sont
+    parcourus par borne decroissante ; des que la somme des bornes restantes ne
+    permet plus a un nouvel article de battre le k-ieme score courant, on arrete
+    d'ajouter des candidats et on ne fait que completer le score des candidats
+    existants (recherche binaire dans les posting lists restantes).
+    """
+
+    def __init__(self, indptr, indices, data, max_scores, n_docs):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.max_scores = max_scores
+        self.n_docs = n_docs
+
+    @classmethod
+    def from_matrix(cls, X_tfidf):
+        X = csc_matrix(X_tfidf)
+        X.sort_indices()
+        max_scores = np.zeros(X.shape[1], dtype=X.data.dtype)
+        nonempty = np.diff(X.indptr) > 0
+        max_scores[nonempty] = np.maximum.reduceat(X.data, X.indptr[:-1][nonempty])
+        return cls(X.indptr, X.indices, X.data, max_scores, X.shape[0])
+
+    def postings(self, term):
+        start, end = self.indptr[term], self.indptr[term + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def search(self, v_query, k, exclude_rows=None, pad=True):
+        """
+        v_query : vecteur (1, D) sparse, poids >= 0 (profil TF-IDF)
+        pad     : completer avec des articles a score nul s'il y a moins de k resultats
+        Retourne (rows, scores) tries par score decroissant, comme retrieval.top_k.
+        """
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        q = csr_matrix(v_query)
+        terms, weights = q.indices, q.data
+        keep = weights != 0
+        terms, weights = terms[keep], weights[keep]
+        if weights.size and weights.min() < 0:
+            # les bornes MaxScore supposent des poids positifs -> calcul exhaustif
+            return self._exhaustive(q, k, exclude_rows)
+
+        excluded = np.empty(0, dtype=np.int64)
+        if exclude_rows is not None and len(exclude_rows):
+            excluded = np.unique(np.asarray(list(exclude_rows), dtype=np.int64))
+
+        # termes par borne decroissante ; remaining[i] = somme des bornes des termes i..fin
+        upper = weights * self.max_scores[terms]
+        order = np.argsort(-upper, kind="stable")
+        terms, weights, upper = terms[order], weights[order], upper[order]
+        remaining = np.cumsum(upper[::-1])[::-1]
+
+        cand = np.empty(0, dtype=np.int64)
+        acc = np.empty(0, dtype=np.float64)
+        theta = 0.0
+        n_terms = len(terms)
+
+        # 1) termes "essentiels" : leurs posting lists peuvent faire entrer de nouveaux articles
+        i = 0
+        while i < n_terms:
+            if remaining[i] <= theta:
+                break
+            docs, vals = self.postings(terms[i])
+            cand, inv = np.unique(np.concatenate([cand, docs]), return_inverse=True)
+            acc = np.bincount(
+                inv, weights=np.concatenate([acc, vals * weights[i]]), minlength=len(cand)
+            )
+            theta = self._kth_score(cand, acc, k, excluded)
+            i += 1
+
+        # 2) termes non essentiels : seulement pour les candidats encore capables d'entrer
+        while i < n_terms and len(cand):
+            alive = acc + remaining[i] >= theta
+            cand, acc = cand[alive], acc[alive]
+            docs, vals = self.postings(terms[i])
+            if len(docs) and len(cand):
+                pos = np.minimum(np.searchsorted(docs, cand), len(docs) - 1)
+                hit = docs[pos] == cand
+                acc[hit] += vals[pos[hit]] * weights[i]
+            i += 1
+
+        if len(excluded):
+            keep = ~np.isin(cand, excluded)
+            cand, acc = cand[keep], acc[keep]
+
+        best, scores = select_top_k(acc, k)
+        rows = cand[best]
+        if pad and len(rows) < k:
+            rows, scores = self._pad(rows, scores, k, excluded)
+        return rows, scores
+
+    @staticmethod
+    def _kth_score(cand, acc, k, excluded):
+        if len(excluded):
+            acc = acc[~np.isin(cand, excluded)]
+        if len(acc) < k:
+            return 0.0
+        return float(np.partition(acc, len(acc) - k)[len(acc) - k])
+
+    def _pad(self, rows, scores, k, excluded):
+        # moins de k articles avec un score > 0 : on complete avec des scores nuls,
+        # comme le ferait le calcul exhaustif
+        taken = set(rows.tolist()) | set(excluded.tolist())
+        extra = []
+        for r in range(self.n_docs):
+            if len(rows) + len(extra) >= k:
+                break
+            if r not in taken:
+                extra.append(r)
+        rows = np.concatenate([rows, np.asarray(extra, dtype=rows.dtype)])
+        scores = np.concatenate([scores, np.zeros(len(extra), dtype=scores.dtype)])
+        return rows, scores
+
+    def _exhaustive(self, q, k, exclude_rows):
+        X = csc_matrix((self.data, self.indices, self.indptr), shape=(self.n_docs, len(self.max_scores)))
+        sims = linear_kernel(q, X).ravel()
+        return select_top_k(sims, k, exclude_rows=exclude_rows)
@@ -0,0 +1,122 @@
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.sparse import csr_matrix
+from src.config import NEIGHBORS_K, NEIGHBORS_BLOCK_MEMORY_MB, NEIGHBORS_N_JOBS
+from src.artifacts import (
+    bundle_dir, current_bundle, link_bundle_files, load_artifacts, load_meta, new_bundle_tmp, publish_bundle,
+)
+
+NEIGHBORS_IDX_FILE = "N_idx.npy"
+NEIGHBORS_SCORES_FILE = "N_scores.npy"
+
+
+def _block_neighbors(X, start, stop, k):
+    """Top-k voisins (cosinus) des lignes start..stop, sans l'article lui-meme."""
+    sims = (X[start:stop] @ X.T).toarray()
+    local = np.arange(stop - start)
+    sims[local, local + start] = -1  # on exclut l'article lui-meme
+
+    idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    scores = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    return idx.astype(np.int32), scores.astype(np.float32)
+
+
+def build_neighbor_table(X_tfidf, k=NEIGHBORS_K, block_memory_mb=NEIGHBORS_BLOCK_MEMORY_MB,
+                         n_jobs=NEIGHBORS_N_JOBS):
+    """
+    Table des k plus proches voisins de chaque article.
+    Produit X[bloc] @ X.T par blocs de lignes : la memoire est bornee par
+    block_memory_mb (bloc dense de similarites) par worker, les blocs sont
+    repartis sur les coeurs avec joblib.
+    Retourne (idx int32 (n, k), scores float32 (n, k)).
+    """
+    X = csr_matrix(X_tfidf)
+    n = X.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int32), np.empty((n, 0), dtype=np.float32)
+
+    block_size = max(1, int(block_memory_mb * 1024 * 1024 / (8 * n)))
+    blocks = Parallel(n_jobs=n_jobs)(
+        delayed(_block_neighbors)(X, start, min(start + block_size, n), k)
+        for start in range(0, n, block_size)
+    )
+    idx = np.vstack([b[0] for b in blocks])
+    scores = np.vstack([b[1] for b in blocks])
+    return idx, scores
+
+
+def save_neighbor_table(idx, scores, path=None, fingerprint=None):
+    """
+    Publie une nouvelle version du bundle avec la table (et son empreinte dans
+    meta.json) : copie de la version courante + N_*.npy, la version servie
+    n'est jamais modifiee.
+    fingerprint : empreinte du bundle sur lequel la table a ete calculee ; si
+    le bundle a ete republie entretemps, rien n'est ecrit (retourne None).
+    """
+    if path is None:
+        path = bundle_dir()
+    src = current_bundle(path)
+    meta = load_meta(src)
+    if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+        print("[WARN] Bundle republie pendant le calcul des voisins -> table non ecrite")
+        return None
+    tmp = new_bundle_tmp(path)
+    link_bundle_files(src, tmp, skip=(NEIGHBORS_IDX_FILE, NEIGHBORS_SCORES_FILE))
+    np.save(tmp / NEIGHBORS_IDX_FILE, idx)
+    np.save(tmp / NEIGHBORS_SCORES_FILE, scores)
+    extra = {k: v for k, v in meta.items() if k not in ("version", "created_at")}
+    extra["neighbors"] = {
+        "k": int(idx.shape[1]),
+        "n_docs": int(idx.shape[0]),
+        "fingerprint": meta["fingerprint"],
+    }
+    return publish_bundle(tmp, path, meta["fingerprint"], (meta["n_docs"], meta["n_features"]), meta["nnz"], extra)
+
+
+def load_neighbor_table(path=None, mmap=False):
+    """
+    (idx, scores) si la table existe et correspond au bundle courant, sinon None.
+    """
+    path = current_bundle(path)
+    meta = load_meta(path)
+    if meta is None or "neighbors" not in meta:
+        return None
+    if meta["neighbors"].get("fingerprint") != meta.get("fingerprint"):
+        print("[WARN] Table de voisins perimee -> calcul a la volee")
+        return None
+    mmap_mode = "r" if mmap else None
+    idx = np.load(path / NEIGHBORS_IDX_FILE, mmap_mode=mmap_mode)
+    scores = np.load(path / NEIGHBORS_SCORES_FILE, mmap_mode=mmap_mode)
+    return idx, scores
+
+
+def lookup_neighbors(neighbors, row, top_k):
+    """
+    Voisins precalcules de la ligne `row`, ou None si la table ne peut pas
+    repondre (article ajoute apres le build, ou top_k plus grand que la table).
+    """
+    if neighbors is None:
+        return None
+    idx, scores = neighbors
+    if row >= idx.shape[0] or top_k > idx.shape[1]:
+        return None
+    if top_k <= 0:
+        # idx[row, :-3] partirait de la fin de la ligne
+        return np.empty(0, dtype=idx.dtype), np.empty(0, dtype=scores.dtype)
+    return np.asarray(idx[row, :top_k]), np.asarray(scores[row, :top_k])
+
+
+if __name__ == "__main__":
+    # Job offline : python -m src.neighbors (apres python -m src.artifacts)
+    loaded = load_artifacts()
+    if loaded is None:
+        raise SystemExit("Pas de bundle d'artefacts : lancer d'abord python -m src.artifacts")
+    _, X, _, meta = loaded
+    print(f">> Calcul des {NEIGHBORS_K} voisins de {X.shape[0]} articles...")
+    idx, scores = build_neighbor_table(X)
+    save_neighbor_table(idx, scores, fingerprint=meta["fingerprint"])
+    print(f"Table ecrite dans {bundle_dir()} : {idx.shape}")
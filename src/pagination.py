@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+import uuid
+import zlib
+import numpy as np
+from src.config import PAGE_CANDIDATES, CURSOR_SECRET, CURSOR_KEY_PATH, CURSOR_TTL
+
+_SIG_BYTES = 16         # HMAC-SHA256 tronque
+_TAG_BYTES = 8          # empreinte de la version (modele + trends)
+_HEADER_BYTES = _TAG_BYTES + 4 + 4 + 2      # tag | emission | n | longueur des noms
+
+
+class CursorError(Exception):
+    """Curseur illisible (400), d'une autre version du modele ou expire (410)."""
+
+    def __init__(self, message, expired=False):
+        super().__init__(message)
+        self.expired = expired
+
+
+def version_tag(version):
+    """Empreinte courte d'une version (snapshot, trends), verifiee a chaque page."""
+    return hashlib.sha1(repr(version).encode("utf-8")).digest()[:_TAG_BYTES]
+
+
+def cursor_key(secret=CURSOR_SECRET, path=CURSOR_KEY_PATH):
+    """
+    Cle HMAC des curseurs, la meme pour tous les workers : CURSOR_SECRET, sinon
+    cle aleatoire ecrite une fois dans path (le premier worker la cree, les
+    autres la relisent).
+    """
+    if secret:
+        return secret.encode("utf-8")
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}")
+        tmp.write_bytes(os.urandom(32))
+        try:
+            # creation atomique : un seul worker gagne, sa cle est lue par tous
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink()
+    return path.read_bytes()
+
+
+class CursorStore:
+    """
+    Curseurs de pagination pour le scroll infini, sans etat cote serveur.
+
+    Une liste est calculee une fois avec une profondeur genereuse (PAGE_CANDIDATES),
+    les pages suivantes sont de simples tranches. Le curseur porte lui-meme la
+    suite de la liste : lignes (int32) + scores et colonnes (float32), l'empreinte
+    de la version et la date d'emission, le tout compresse et signe (HMAC).
+    N'importe quel worker sert donc la page suivante, meme apres un redemarrage,
+    sans memoire par liste. Le curseur raccourcit a chaque page ; une liste
+    calculee sur une autre version du modele ou des trends, ou emise il y a plus
+    de ttl secondes, est refusee (410).
+    La date d'emission est arrondie au debut de la fenetre courante (ttl / 2) :
+    meme liste, meme version et meme fenetre -> meme curseur, et un curseur
+    servi depuis le cache de reponses (window() dans la cle) vit encore au
+    moins ttl / 2.
+    """
+
+    def __init__(self, depth=PAGE_CANDIDATES, key=None, ttl=CURSOR_TTL):
+        self.depth = depth
+        self.ttl = ttl
+        self._key = cursor_key() if key is None else key
+
+    def window(self, now=None):
+        """Debut (s) de la fenetre d'emission courante."""
+        now = time.time() if now is None else now
+        step = max(self.ttl // 2, 1)
+        return int(now) // step * step
+
+    def open(self, rows, scores, version, offset, columns=None):
+        """
+        Curseur de la page commencant a `offset` de la liste (rows, scores),
+        None si la liste s'arrete avant.
+        columns : colonnes supplementaires alignees sur rows (ex. trend_score).
+        Meme liste, meme version et meme window() -> meme curseur (reponses cachees par ETag).
+        """
+        rows = np.asarray(rows, dtype=np.int32)[:self.depth]
+        if offset >= len(rows):
+            return None
+        columns = {name: np.asarray(col)[:self.depth][offset:] for name, col in (columns or {}).items()}
+        return self._encode(version_tag(version), self.window(), rows[offset:],
+                            np.asarray(scores)[:self.depth][offset:], columns)
+
+    def page(self, cursor, version, page_size):
+        """
+        Page suivante d'un curseur : (rows, scores, columns, next_cursor).
+        Leve CursorError si le curseur est invalide, d'une autre version ou expire.
+        """
+        tag, issued_at, rows, scores, columns = self._decode(cursor)
+        if tag != version_tag(version):
+            # liste calculee sur un autre modele / d'autres trends
+            raise CursorError("Cursor expired", expired=True)
+        if time.time() - issued_at > self.ttl:
+            raise CursorError("Cursor expired", expired=True)
+
+        next_cursor = None
+        if page_size < len(rows):
+            # les pages suivantes gardent la date d'emission de la liste
+            next_cursor = self._encode(tag, issued_at, rows[page_size:], scores[page_size:],
+                                       {name: col[page_size:] for name, col in columns.items()})
+        return rows[:page_size], scores[:page_size], \
+            {name: col[:page_size] for name, col in columns.items()}, next_cursor
+
+    # ---- format : signature | zlib(tag | emission | n | noms des colonnes | tableaux) ----
+
+    def _encode(self, tag, issued_at, rows, scores, columns):
+        names = ",".join(columns).encode("utf-8")
+        arrays = [rows.astype(np.int32), np.asarray(scores, dtype=np.float32)]
+        arrays += [np.asarray(col, dtype=np.float32) for col in columns.values()]
+        payload = zlib.compress(
+            tag + issued_at.to_bytes(4, "little") + len(rows).to_bytes(4, "little")
+            + len(names).to_bytes(2, "little") + names
+            + b"".join(a.tobytes() for a in arrays)
+        )
+        sig = hmac.new(self._key, payload, hashlib.sha256).digest()[:_SIG_BYTES]
+        return base64.urlsafe_b64encode(sig + payload).decode().rstrip("=")
+
+    def _decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode())
+        except Exception:
+            raise CursorError("Invalid cursor")
+        sig, payload = raw[:_SIG_BYTES], raw[_SIG_BYTES:]
+        if not hmac.compare_digest(sig, hmac.new(self._key, payload, hashlib.sha256).digest()[:_SIG_BYTES]):
+            raise CursorError("Invalid cursor")
+        data = zlib.decompress(payload)
+        tag = data[:_TAG_BYTES]
+        issued_at = int.from_bytes(data[_TAG_BYTES:_TAG_BYTES + 4], "little")
+        n = int.from_bytes(data[_TAG_BYTES + 4:_TAG_BYTES + 8], "little")
+        pos = _HEADER_BYTES
+        n_names = int.from_bytes(data[pos - 2:pos], "little")
+        names = data[pos:pos + n_names].decode("utf-8").split(",") if n_names else []
+        pos += n_names
+        rows = np.frombuffer(data, dtype=np.int32, count=n, offset=pos)
+        values = [np.frombuffer(data, dtype=np.float32, count=n, offset=pos + 4 * n * (i + 1))
+                  for i in range(len(names) + 1)]
+        return tag, issued_at, rows, values[0], dict(zip(names, values[1:]))
@@ -1,50 +1,112 @@
 import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from src.text_vectorizer import raw_tfidf
 
-def build_profile_text(preferences: dict, profile_kw_df: pd.DataFrame) -> str:
+
+class ProfileLexicon:
     """
-    preferences: dict comme {"field": ["machine_learning", "finance"],
-                              "type": ["empirical"]}
-    profile_kw_df: colonnes [dimension, option, keywords]
+    profile_keywords.csv compile une fois au demarrage :
+      - keywords[(dimension, option)] -> chaine de mots-cles (1ere ligne, comme avant)
+      - rows : (option nettoyee, mots-cles) dans l'ordre du CSV
+      - token_index : mot-cle -> lignes du CSV qui le contiennent
+      - vectors[(dimension, option)] : poids TF-IDF bruts de l'option (apres attach_vectorizer)
     """
-    tokens = []
+
+    def __init__(self, profile_kw_df: pd.DataFrame):
+        self.keywords = {}
+        self.rows = []
+        self.token_index = {}
+        for dim, opt, keywords_str in profile_kw_df[["dimension", "option", "keywords"]].itertuples(index=False):
+            self.keywords.setdefault((dim, opt), keywords_str)
+            row = len(self.rows)
+            self.rows.append((opt.replace("_", " "), keywords_str))
+            for tok in set(keywords_str.split()):
+                self.token_index.setdefault(tok, []).append(row)
+        self.vectors = {}
+        self.n_features = None
+        self.dtype = None
+
+    def attach_vectorizer(self, vectorizer):
+        """Precalcule le vecteur de chaque (dimension, option) : plus de transform par requete."""
+        keys = list(self.keywords)
+        X = raw_tfidf(vectorizer, [self.keywords[k] for k in keys])
+        self.vectors = {k: X[i] for i, k in enumerate(keys)}
+        self.n_features = X.shape[1]
+        # float32 avec le modele compact : les profils gardent le type de X_tfidf
+        self.dtype = X.dtype
+        return self
+
+
+def compile_profile_keywords(profile_kw_df: pd.DataFrame, vectorizer=None) -> ProfileLexicon:
+    lexicon = ProfileLexicon(profile_kw_df)
+    if vectorizer is not None:
+        lexicon.attach_vectorizer(vectorizer)
+    return lexicon
+
+
+def _selected_options(preferences: dict):
     for dim, options in preferences.items():
         if not isinstance(options, list):
             options = [options]
         for opt in options:
-            mask = (profile_kw_df["dimension"] == dim) & (profile_kw_df["option"] == opt)
-            matches = profile_kw_df.loc[mask]
-            if not matches.empty:
-                tokens.append(matches.iloc[0]["keywords"])
+            yield dim, opt
+
+
+def build_profile_text(preferences: dict, profile_kw_df) -> str:
+    """
+    preferences: dict comme {"field": ["machine_learning", "finance"],
+                              "type": ["empirical"]}
+    profile_kw_df: colonnes [dimension, option, keywords], ou ProfileLexicon compile
+    """
+    if isinstance(profile_kw_df, ProfileLexicon):
+        keywords = profile_kw_df.keywords
+        return " ".join(
+            keywords[key] for key in _selected_options(preferences) if key in keywords
+        )
+
+    tokens = []
+    for dim, opt in _selected_options(preferences):
+        mask = (profile_kw_df["dimension"] == dim) & (profile_kw_df["option"] == opt)
+        matches = profile_kw_df.loc[mask]
+        if not matches.empty:
+            tokens.append(matches.iloc[0]["keywords"])
     return " ".join(tokens)
 
-def profile_from_text(raw_text: str, profile_kw_df: pd.DataFrame) -> str:
+def build_profile_vector(preferences: dict, lexicon: ProfileLexicon):
+    """
+    Vecteur de profil (1, D) assemble a partir des vecteurs caches des options :
+    somme des poids TF-IDF bruts puis normalisation L2, sans repasser par le vectorizer.
+    Equivalent a profile_to_vector(build_profile_text(...)) aux bigrammes a cheval
+    entre deux options pres.
+    """
+    v = csr_matrix((1, lexicon.n_features), dtype=lexicon.dtype)
+    for key in _selected_options(preferences):
+        vec = lexicon.vectors.get(key)
+        if vec is not None:
+            v = v + vec
+    return normalize(v)
+
+def profile_from_text(raw_text: str, profile_kw_df) -> str:
     """
     Prend un texte brut (ex: "Attention is all you need"), le nettoie,
     et l'enrichit avec les mots-clés du CSV si des concepts sont détectés.
     """
     if not raw_text:
         return ""
-    
+
     text_lower = raw_text.lower().strip()
-    enrichments = []
-    
+    lexicon = profile_kw_df if isinstance(profile_kw_df, ProfileLexicon) else ProfileLexicon(profile_kw_df)
     input_tokens = set(text_lower.split())
-    for _, row in profile_kw_df.iterrows():
-        # Options nettoyées (ex: "deep_learning" => "deep learning")
-        option_clean = row['option'].replace("_", " ")
-        keywords_str = row['keywords']
-        
-        # logic
-        # A. Est-ce que le nom d'une catégorie est dans le text ? On parcours row by row pour trouver
-        if option_clean in text_lower:
-            enrichments.append(keywords_str)
-            continue
-        # B. Est-ce que des mots-clés spécifiques sont dans le texte ?
-        kw_tokens = set(keywords_str.split())
-        # Intersection : Si on a des mots en commun entre l'entrée et la ligne du CSV
-        if not input_tokens.isdisjoint(kw_tokens):
-            enrichments.append(keywords_str)
 
+    # A. Est-ce que le nom d'une catégorie est dans le text ?
+    matched = {row for row, (option_clean, _) in enumerate(lexicon.rows) if option_clean in text_lower}
+    # B. Est-ce que des mots-clés spécifiques sont dans le texte ? (index mot-cle -> lignes)
+    for tok in input_tokens:
+        matched.update(lexicon.token_index.get(tok, ()))
+
+    # ordre du CSV, chaque ligne au plus une fois (comme avant)
+    enrichments = [lexicon.rows[row][1] for row in sorted(matched)]
     full_text = text_lower + " " + " ".join(enrichments)
     return full_text
 
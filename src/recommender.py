@@ -1,38 +1,83 @@
 import numpy as np
-from scipy.sparse import csr_matrix, issparse
+from scipy.sparse import csr_matrix, issparse, vstack
 from sklearn.metrics.pairwise import linear_kernel
-from src.config import TOP_K_MAIN, TOP_K_SIMILAR, PROFILE_ALPHA
-from src.get_trends import get_hot_terms
-
-def recommend_for_profile(v_profile, X_tfidf, articles_df, top_k=TOP_K_MAIN, exclude_ids=None):
-    if exclude_ids is None:
-        exclude_ids = set()
+from src.config import TOP_K_MAIN, TOP_K_SIMILAR, PROFILE_ALPHA, PROFILE_BATCH_CHUNK
+from src.get_trends import get_hot_terms, get_trends_version
+from src.retrieval import rows_for_ids, top_k as select_top_k, take_rows
+from src.neighbors import lookup_neighbors
+from src.trend_matcher import build_token_corpus, compile_trends, count_trend_matches
+
+def rank_for_profile(v_profile, X_tfidf, articles_df, top_k=TOP_K_MAIN, exclude_ids=None,
+                     id_index=None, inverted_index=None):
+    """Classement brut du profil : (rows, scores) tries, sans construire de DataFrame."""
+    # on exclut certains articles si besoin (par numero de ligne)
+    exclude_rows = rows_for_ids(exclude_ids, articles_df, id_index) if exclude_ids else None
+    if inverted_index is not None:
+        # posting lists : on ne touche que les articles qui partagent des termes avec le profil
+        return inverted_index.search(v_profile, top_k, exclude_rows=exclude_rows)
     sims = linear_kernel(v_profile, X_tfidf).ravel()
-    # on exclut certains articles si besoin
-    mask = ~articles_df["id"].isin(exclude_ids)
-    sims_filtered = sims.copy()
-    sims_filtered[~mask.values] = -1  # penalite
-    idx_sorted = sims_filtered.argsort()[::-1][:top_k]
-    return articles_df.iloc[idx_sorted]
-    
-def update_profile_with_likes(v_profile, liked_ids, X_tfidf, articles_df, alpha=PROFILE_ALPHA):
+    return select_top_k(sims, top_k, exclude_rows=exclude_rows)
+
+def recommend_for_profile(v_profile, X_tfidf, articles_df, top_k=TOP_K_MAIN, exclude_ids=None,
+                          id_index=None, inverted_index=None):
+    rows, scores = rank_for_profile(
+        v_profile, X_tfidf, articles_df, top_k, exclude_ids=exclude_ids,
+        id_index=id_index, inverted_index=inverted_index,
+    )
+    return take_rows(articles_df, rows, scores)
+
+def rank_for_profiles(V_profiles, X_tfidf, articles_df, top_k=TOP_K_MAIN, exclude_ids_list=None,
+                      id_index=None, chunk_size=PROFILE_BATCH_CHUNK):
+    """
+    Version batch de rank_for_profile (digests, jobs nocturnes).
+    V_profiles : matrice (n_profils, D) ou liste de vecteurs (1, D)
+    exclude_ids_list : liste (un set d'ids par profil) ou None
+    Les profils sont scores par paquets de chunk_size avec un seul produit
+    matriciel par paquet. Retourne une liste de (rows, scores) (un par profil).
+    """
+    if isinstance(V_profiles, list):
+        V_profiles = vstack([csr_matrix(v) for v in V_profiles]) if V_profiles else csr_matrix((0, X_tfidf.shape[1]))
+    V = csr_matrix(V_profiles)
+    if exclude_ids_list is None:
+        exclude_ids_list = [None] * V.shape[0]
+
+    results = []
+    for start in range(0, V.shape[0], chunk_size):
+        sims = linear_kernel(V[start:start + chunk_size], X_tfidf)  # (chunk, n_articles)
+        for i, row_sims in enumerate(sims):
+            exclude_ids = exclude_ids_list[start + i]
+            exclude_rows = rows_for_ids(exclude_ids, articles_df, id_index) if exclude_ids else None
+            results.append(select_top_k(row_sims, top_k, exclude_rows=exclude_rows))
+    return results
+
+def recommend_for_profiles(V_profiles, X_tfidf, articles_df, top_k=TOP_K_MAIN, exclude_ids_list=None,
+                           id_index=None, chunk_size=PROFILE_BATCH_CHUNK):
+    """Comme rank_for_profiles, mais retourne une liste de DataFrames (un par profil)."""
+    ranked = rank_for_profiles(
+        V_profiles, X_tfidf, articles_df, top_k, exclude_ids_list=exclude_ids_list,
+        id_index=id_index, chunk_size=chunk_size,
+    )
+    return [take_rows(articles_df, rows, scores) for rows, scores in ranked]
+
+def update_profile_with_likes(v_profile, liked_ids, X_tfidf, articles_df, alpha=PROFILE_ALPHA, id_index=None):
     """
     v_profile : vecteur TF-IDF (1, D) du profil courant
     liked_ids : liste D id d'articles que l'utilisateur a likés
     X_tfidf   : matrice TF-IDF des articles
     articles_df : DataFrame des articles
     alpha     : poids du profil initial vs likes (0 <= alpha <= 1)
+    id_index  : index id -> ligne (optionnel, evite un scan du DataFrame)
 
     Retourne un nouveau vecteur de profil v_new.
     """
     if not liked_ids:
         return v_profile
 
-    mask = articles_df["id"].isin(liked_ids)
-    if not mask.any():
+    rows = rows_for_ids(liked_ids, articles_df, id_index)
+    if rows.size == 0:
         return v_profile
 
-    liked_vecs = X_tfidf[mask.values]         # vecteurs des articles likés -> sparse (n_liked, D)
+    liked_vecs = X_tfidf[rows]                # vecteurs des articles likés -> sparse (n_liked, D)
     liked_centroid = liked_vecs.mean(axis=0)  # centroide (1, D)
 
     # assurer CSR : debug
@@ -41,51 +86,150 @@ def update_profile_with_likes(v_profile, liked_ids, X_tfidf, articles_df, alpha=
 
     if not issparse(v_profile):
         v_profile = csr_matrix(v_profile)
-    
+
     v_new = alpha * v_profile + (1 - alpha) * liked_centroid
     return v_new
 
-def recommend_similar_to_article(article_id, X_tfidf, articles_df, top_k=TOP_K_SIMILAR):
-    mask = (articles_df["id"] == article_id)
-    if not mask.any():
+def rank_similar_to_article(article_id, X_tfidf, articles_df, top_k=TOP_K_SIMILAR, id_index=None,
+                            neighbors=None):
+    """(rows, scores) des articles les plus proches ; ValueError si l'id est inconnu."""
+    rows = rows_for_ids([article_id], articles_df, id_index)
+    if rows.size == 0:
         raise ValueError("article_id inconnu")
-    idx = np.where(mask.values)[0][0]
+    return rank_similar_to_row(rows[0], X_tfidf, top_k, neighbors=neighbors)
+
+def rank_similar_to_row(idx, X_tfidf, top_k=TOP_K_SIMILAR, neighbors=None):
+    # table de voisins precalculee : simple lecture de tableau
+    found = lookup_neighbors(neighbors, idx, top_k)
+    if found is not None:
+        return found
+
+    # article ajoute apres le build (ou pas de table) : calcul a la volee
     vec = X_tfidf[idx]
     sims = linear_kernel(vec, X_tfidf).ravel()
-    sims[idx] = -1  # on exclut l'article lui-meme
-    idx_sorted = sims.argsort()[::-1][:top_k]
-    return articles_df.iloc[idx_sorted]
-
+    # on exclut l'article lui-meme
+    return select_top_k(sims, top_k, exclude_rows=[idx])
 
-def recommend_hot_articles(articles_df, top_k=TOP_K_MAIN):
-    articles_df = articles_df.copy()
+def recommend_similar_to_article(article_id, X_tfidf, articles_df, top_k=TOP_K_SIMILAR, id_index=None,
+                                 neighbors=None):
+    rows, scores = rank_similar_to_article(
+        article_id, X_tfidf, articles_df, top_k, id_index=id_index, neighbors=neighbors
+    )
+    return take_rows(articles_df, rows, scores)
 
-    # 1) Récupère les tendances (arXiv ou fallback interne)
-    trends = get_hot_terms(articles_df, top_n=10)
-    trends = [t.lower() for t in trends]
 
-    if "text" not in articles_df.columns:
-        articles_df["text"] = articles_df["title"] + " " + articles_df["abstract"]
+# Classement "hot" materialise : recalcule seulement quand le jeu de tendances change
+_HOT_RANKING = {}
 
-    # 2) trend_score
-    def compute_trend_score(text: str):
-        txt = text.lower()
-        return sum(t in txt for t in trends)
 
-    articles_df["trend_score"] = articles_df["text"].apply(compute_trend_score)
+def compute_hot_scores(articles_df, trends, token_corpus):
+    """
+    Scores hot de tous les articles pour un jeu de tendances.
+    token_corpus : corpus tokenise du bundle (load_token_corpus) ou build_token_corpus.
+    Retourne (trend_score, final_hot_score) en tableaux numpy.
+    """
+    # 2) trend_score : nb de tendances presentes (phrases matchees sur les tokens)
+    trend_score = count_trend_matches(token_corpus, compile_trends(trends, token_corpus))
 
     # 3) normalisation recence + citations
-    year_norm = (articles_df["year"] - articles_df["year"].min()) / \
-                (articles_df["year"].max() - articles_df["year"].min())
-
-    cite_norm = (articles_df["cite_nb"] - articles_df["cite_nb"].min()) / \
-                (articles_df["cite_nb"].max() - articles_df["cite_nb"].min())
+    year = articles_df["year"].to_numpy(dtype=float, na_value=np.nan)
+    cite = articles_df["cite_nb"].to_numpy(dtype=float, na_value=np.nan)
+    year_norm = (year - np.nanmin(year)) / (np.nanmax(year) - np.nanmin(year))
+    cite_norm = (cite - np.nanmin(cite)) / (np.nanmax(cite) - np.nanmin(cite))
 
     # 4) Score final
-    articles_df["final_hot_score"] = (
-        0.5 * articles_df["trend_score"]
-        + 0.3 * year_norm
-        + 0.2 * cite_norm
-    )
+    final_hot_score = 0.5 * trend_score + 0.3 * year_norm + 0.2 * cite_norm
+    return trend_score, final_hot_score
+
+
+def cached_hot_ranking(articles_df, version):
+    """Classement hot en memoire s'il correspond a ce corpus et a cette version de tendances."""
+    cached = _HOT_RANKING.get("ranking")
+    if cached is not None and cached["articles_df"] is articles_df and cached["version"] == version:
+        return cached
+    return None
+
+
+def store_hot_ranking(articles_df, version, trends, trend_score, final_hot_score, token_corpus=None):
+    """Trie les scores hot et remplace le classement en memoire."""
+    order = np.argsort(-np.nan_to_num(final_hot_score, nan=-np.inf), kind="stable")
+    ranking = {
+        "articles_df": articles_df,
+        "version": version,
+        "trends": trends,
+        "token_corpus": token_corpus,
+        "order": order,
+        "trend_score": trend_score,
+        "final_hot_score": final_hot_score,
+    }
+    _HOT_RANKING["ranking"] = ranking
+    return ranking
+
 
-    return articles_df.sort_values("final_hot_score", ascending=False).head(top_k)
+def clear_hot_ranking():
+    """Oublie le classement en memoire (et le corpus tokenise qu'il garde), ex. apres un changement de snapshot."""
+    _HOT_RANKING.clear()
+
+
+def get_hot_ranking(articles_df, term_stats=None, trend_service=None, abstracts=None, token_corpus=None):
+    """
+    Classement hot pre-trie (ordre des lignes + scores), garde en memoire et
+    invalide seulement si le corpus ou le jeu de tendances change.
+    Avec un trend_service (API), les tendances et leur version sont lues en
+    memoire ; sinon on passe par le cache disque de la semaine.
+    token_corpus : corpus tokenise du bundle (memory-map) ; sinon construit
+    depuis articles_df + abstracts et garde avec le classement.
+    """
+    cached = _HOT_RANKING.get("ranking")
+    same_corpus = cached is not None and cached["articles_df"] is articles_df
+
+    if trend_service is not None:
+        trends, version = trend_service.get()
+        trends = tuple(t.lower() for t in trends)
+        if same_corpus and cached["version"] == version:
+            return cached
+    else:
+        version = get_trends_version()
+        if same_corpus and version is not None and cached["version"] == version:
+            return cached
+
+        # 1) Récupère les tendances (arXiv ou fallback interne)
+        trends = tuple(t.lower() for t in get_hot_terms(
+            articles_df, top_n=10, term_stats=term_stats, abstracts=abstracts
+        ))
+        version = get_trends_version()
+
+    if same_corpus and cached["trends"] == trends:
+        cached["version"] = version
+        return cached
+
+    # le corpus tokenise ne depend que des articles : reutilise entre jeux de tendances
+    if token_corpus is None:
+        token_corpus = cached["token_corpus"] if same_corpus and cached["token_corpus"] is not None \
+            else build_token_corpus(articles_df, abstracts)
+    trend_score, final_hot_score = compute_hot_scores(articles_df, trends, token_corpus)
+    return store_hot_ranking(articles_df, version, trends, trend_score, final_hot_score, token_corpus)
+
+
+def hot_candidates(articles_df, depth=TOP_K_MAIN, term_stats=None, trend_service=None, ranking=None,
+                   abstracts=None):
+    """
+    Tete du classement hot : (rows, scores, {trend_score, final_hot_score}).
+    ranking : classement deja obtenu (ex. calcule par le pool de scoring), sinon get_hot_ranking.
+    """
+    if ranking is None:
+        ranking = get_hot_ranking(articles_df, term_stats=term_stats, trend_service=trend_service,
+                                  abstracts=abstracts)
+    # classement deja trie : une requete hot est une simple tranche
+    rows = ranking["order"][:depth]
+    columns = {
+        "trend_score": ranking["trend_score"][rows],
+        "final_hot_score": ranking["final_hot_score"][rows],
+    }
+    return rows, ranking["final_hot_score"][rows], columns
+
+def recommend_hot_articles(articles_df, top_k=TOP_K_MAIN, term_stats=None, trend_service=None, abstracts=None):
+    rows, scores, columns = hot_candidates(
+        articles_df, top_k, term_stats=term_stats, trend_service=trend_service, abstracts=abstracts
+    )
+    return take_rows(articles_df, rows, scores).assign(**columns)
@@ -0,0 +1,87 @@
+import threading
+from src.cache import LRUCache
+from src.config import RESULT_CACHE_MAX, RESULT_CACHE_TTL
+
+
+def tags_key(tag_list):
+    """Jeu de tags normalise : ordre et doublons sans effet ("ML, NLP" == "nlp, ml")."""
+    return tuple(sorted(set(tag_list)))
+
+
+def prefs_key(preferences: dict):
+    """Meme normalisation pour un dict de preferences {dimension: [options]}."""
+    items = []
+    for dim, options in preferences.items():
+        if not isinstance(options, list):
+            options = [options]
+        opts = tags_key(str(o) for o in options)
+        if opts:
+            items.append((str(dim), opts))
+    return tuple(sorted(items))
+
+
+def prefs_from_key(key):
+    return {dim: list(opts) for dim, opts in key}
+
+
+class RecommendationCache:
+    """
+    Cache a deux niveaux pour les recos par tags / preferences :
+      - profiles : cle normalisee -> vecteur de profil (1, D)
+      - rankings : (cle normalisee, top_k) -> (rows, scores) classes
+
+    Les lignes et les scores ne sont valables que pour un modele et un jeu de
+    tendances donnes : `version` (ex. (empreinte du bundle, version des trends))
+    fait partie des cles, et un changement de version vide les deux niveaux.
+    Les methodes acceptent une version explicite : une requete encore en cours
+    sur l'ancien snapshot n'ecrit jamais sous la cle du nouveau.
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_MAX, ttl=RESULT_CACHE_TTL):
+        self.profiles = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.rankings = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.version = None
+        self._lock = threading.Lock()
+
+    def set_version(self, version):
+        """A appeler avant chaque lecture ; invalide tout si les artefacts ou les trends ont change."""
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self.profiles.clear()
+            self.rankings.clear()
+
+    def profile(self, key, build, version=None):
+        """Vecteur de profil en cache, sinon build() puis mise en cache."""
+        full_key = (self.version if version is None else version, key)
+        v = self.profiles.get(full_key)
+        if v is None:
+            v = build()
+            self.profiles.set(full_key, v)
+        return v
+
+    def ranking(self, key, top_k, compute, version=None):
+        """(rows, scores) en cache, sinon compute() puis mise en cache."""
+        full_key = (self.version if version is None else version, key, top_k)
+        ranked = self.rankings.get(full_key)
+        if ranked is None:
+            ranked = compute()
+            self.rankings.set(full_key, ranked)
+        return ranked
+
+    async def ranking_async(self, key, top_k, compute, version=None):
+        """Comme ranking, avec compute() coroutine (scoring hors de la boucle asyncio)."""
+        full_key = (self.version if version is None else version, key, top_k)
+        ranked = self.rankings.get(full_key)
+        if ranked is None:
+            ranked = await compute()
+            self.rankings.set(full_key, ranked)
+        return ranked
+
+    def clear(self):
+        self.profiles.clear()
+        self.rankings.clear()
+
+    def stats(self):
+        return {"profiles": self.profiles.stats(), "rankings": self.rankings.stats()}
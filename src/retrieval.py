@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def build_id_index(ids) -> dict[str, int]:
+    """
+    Index id article -> numero de ligne (dans articles_df et X_tfidf).
+    Construit une fois au chargement, remplace les scans `articles_df["id"] == ...`.
+    """
+    return {str(article_id): row for row, article_id in enumerate(ids)}
+
+
+def rows_for_ids(ids, articles_df, id_index=None) -> np.ndarray:
+    """
+    Lignes (triees, sans doublon) des ids connus. Les ids inconnus sont ignores.
+    Sans index, on retombe sur un masque `isin` sur tout le DataFrame.
+    """
+    if not ids:
+        return np.empty(0, dtype=np.int64)
+    if id_index is None:
+        return np.flatnonzero(articles_df["id"].isin(list(ids)).to_numpy(dtype=bool))
+    rows = {id_index[str(i)] for i in ids if str(i) in id_index}
+    return np.fromiter(sorted(rows), dtype=np.int64, count=len(rows))
+
+
+def top_k(scores, k, exclude_rows=None):
+    """
+    Top-k en O(n) avec argpartition (pas de tri du corpus entier).
+    Les lignes exclues sont retirees par numero de ligne, sans masque sur tout le vecteur.
+    Retourne (rows, scores) tries par score decroissant.
+    """
+    scores = np.asarray(scores).ravel()
+    n = scores.shape[0]
+    excluded = set() if exclude_rows is None else {int(r) for r in exclude_rows}
+
+    # on prend un peu plus large pour pouvoir retirer les exclus ensuite
+    k_wide = min(n, k + len(excluded))
+    if k <= 0 or k_wide <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=scores.dtype)
+    if k_wide < n:
+        candidates = np.argpartition(-scores, k_wide - 1)[:k_wide]
+    else:
+        candidates = np.arange(n)
+
+    if excluded:
+        candidates = candidates[~np.isin(candidates, list(excluded))]
+
+    # tri des seuls candidats : score decroissant, puis numero de ligne
+    order = np.lexsort((candidates, -scores[candidates]))
+    rows = candidates[order][:k]
+    return rows, scores[rows]
+
+
+def take_rows(articles_df, rows, scores):
+    """Sous-DataFrame des lignes retenues, avec leur score en colonne."""
+    return articles_df.iloc[rows].assign(score=scores)
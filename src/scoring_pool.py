@@ -0,0 +1,244 @@
+import asyncio
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix, vstack
+from sklearn.metrics.pairwise import linear_kernel
+from starlette.concurrency import run_in_threadpool
+from src.artifacts import (
+    current_bundle, load_abstract_store, load_articles_table, load_inverted_index, load_matrix,
+    load_token_corpus,
+)
+from src.config import (
+    MICROBATCH_MAX, MICROBATCH_WINDOW_MS, PROFILE_BATCH_CHUNK,
+    SCORING_MAX_PENDING, SCORING_WORKERS, USE_INVERTED_INDEX,
+)
+from src.neighbors import load_neighbor_table
+from src.recommender import (
+    cached_hot_ranking,
+    compute_hot_scores,
+    get_hot_ranking,
+    rank_for_profile,
+    rank_for_profiles,
+    rank_similar_to_article,
+    rank_similar_to_row,
+    store_hot_ranking,
+)
+from src.retrieval import rows_for_ids, top_k as select_top_k
+from src.trend_matcher import build_token_corpus
+
+
+class ScoringBusy(Exception):
+    """Trop de requetes de scoring en attente : l'API repond 503."""
+
+
+class LocalScorer:
+    """
+    Mode "threads" : memes fonctions qu'avant, executees dans le threadpool de
+    Starlette pour ne pas bloquer la boucle asyncio.
+    """
+
+    def __init__(self, X_tfidf, articles_df, id_index=None, inverted_index=None, neighbors=None,
+                 abstracts=None, token_corpus=None):
+        self.X_tfidf = X_tfidf
+        self.articles_df = articles_df
+        self.abstracts = abstracts
+        self.token_corpus = token_corpus
+        self.id_index = id_index
+        self.inverted_index = inverted_index
+        self.neighbors = neighbors
+
+    async def rank_profile(self, v_profile, top_k, exclude_ids=None):
+        return await run_in_threadpool(
+            rank_for_profile, v_profile, self.X_tfidf, self.articles_df, top_k,
+            exclude_ids=exclude_ids, id_index=self.id_index, inverted_index=self.inverted_index,
+        )
+
+    async def rank_profiles(self, vectors, top_k):
+        return await run_in_threadpool(
+            rank_for_profiles, vectors, self.X_tfidf, self.articles_df, top_k, id_index=self.id_index
+        )
+
+    async def rank_similar(self, article_id, top_k):
+        return await run_in_threadpool(
+            rank_similar_to_article, article_id, self.X_tfidf, self.articles_df, top_k,
+            id_index=self.id_index, neighbors=self.neighbors,
+        )
+
+    async def hot_ranking(self, trend_service):
+        return await run_in_threadpool(
+            get_hot_ranking, self.articles_df, trend_service=trend_service, abstracts=self.abstracts,
+            token_corpus=self.token_corpus,
+        )
+
+    def close(self):
+        pass
+
+
+# ---- cote worker (un etat par processus) ----
+
+_WORKER = {}
+
+
+def _init_worker(path, use_inverted_index):
+    # tableaux du bundle en memory-map : les workers partagent les pages du page cache
+    path = Path(path)
+    _WORKER["path"] = path
+    _WORKER["X"] = load_matrix(path, mmap=True)
+    _WORKER["inverted_index"] = load_inverted_index(path, mmap=True) if use_inverted_index else None
+    _WORKER["neighbors"] = load_neighbor_table(path, mmap=True)
+
+
+def _worker_rank_profiles(V, top_k, exclude_rows_list):
+    """Un micro-batch de profils : un seul produit matriciel par paquet."""
+    X = _WORKER["X"]
+    index = _WORKER["inverted_index"]
+    if V.shape[0] == 1 and index is not None:
+        # requete isolee : les posting lists (MaxScore) sont plus rapides que le produit complet
+        return [index.search(V, top_k, exclude_rows=exclude_rows_list[0])]
+
+    results = []
+    for start in range(0, V.shape[0], PROFILE_BATCH_CHUNK):
+        sims = linear_kernel(V[start:start + PROFILE_BATCH_CHUNK], X)
+        for i, row_sims in enumerate(sims):
+            results.append(select_top_k(row_sims, top_k, exclude_rows=exclude_rows_list[start + i]))
+    return results
+
+
+def _worker_rank_similar(row, top_k):
+    return rank_similar_to_row(row, _WORKER["X"], top_k, neighbors=_WORKER["neighbors"])
+
+
+def _worker_hot_scores(trends):
+    # corpus tokenise du bundle, memory-mappe au premier appel (pages partagees entre workers)
+    if "token_corpus" not in _WORKER:
+        path = _WORKER["path"]
+        _WORKER["articles"] = load_articles_table(path)
+        _WORKER["token_corpus"] = (
+            load_token_corpus(path, mmap=True) or build_token_corpus(_WORKER["articles"], load_abstract_store(path))
+        )
+    return compute_hot_scores(_WORKER["articles"], trends, _WORKER["token_corpus"])
+
+
+# ---- cote API ----
+
+class ScoringPool:
+    """
+    Mode "pool" : le scoring part dans un pool de processus, la boucle asyncio
+    ne fait plus que l'I/O et la serialisation.
+
+    - les workers ouvrent le bundle en memory-map (une seule copie en RAM) ;
+      path : version du bundle du snapshot (dossier resolu, jamais modifie),
+      un nouveau snapshot cree son propre pool
+    - les requetes profil arrivant dans la meme fenetre (MICROBATCH_WINDOW_MS)
+      sont regroupees en une matrice et scorees par un seul produit
+    - au-dela de max_pending requetes en cours, ScoringBusy (503) plutot
+      qu'une file d'attente qui grossit sans fin
+    """
+
+    def __init__(self, articles_df, id_index, path=None, workers=SCORING_WORKERS,
+                 max_pending=SCORING_MAX_PENDING, batch_window_ms=MICROBATCH_WINDOW_MS,
+                 max_batch=MICROBATCH_MAX):
+        self.articles_df = articles_df
+        self.id_index = id_index
+        self.max_pending = max_pending
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = 0
+        self._batch = []            # (v_profile, top_k, exclude_rows, future)
+        self._flush_handle = None
+        # spawn : pas de fork d'un process qui a deja des threads (trend service)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(current_bundle(path)), USE_INVERTED_INDEX),
+        )
+
+    # ---- backpressure ----
+
+    def _admit(self):
+        if self._pending >= self.max_pending:
+            raise ScoringBusy()
+        self._pending += 1
+
+    def _release(self):
+        self._pending -= 1
+
+    async def _submit(self, fn, *args):
+        self._admit()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._release()
+
+    # ---- micro-batch des profils ----
+
+    async def rank_profile(self, v_profile, top_k, exclude_ids=None):
+        self._admit()
+        try:
+            exclude_rows = rows_for_ids(exclude_ids, self.articles_df, self.id_index) if exclude_ids else None
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._batch.append((csr_matrix(v_profile), top_k, exclude_rows, future))
+            if len(self._batch) >= self.max_batch:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_window, self._flush)
+            return await future
+        finally:
+            self._release()
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        V = vstack([v for v, _, _, _ in batch]).tocsr()
+        top_k = max(k for _, k, _, _ in batch)
+        task = asyncio.get_running_loop().run_in_executor(
+            self._executor, _worker_rank_profiles, V, top_k, [rows for _, _, rows, _ in batch]
+        )
+
+        def dispatch(done):
+            error = asyncio.CancelledError() if done.cancelled() else done.exception()
+            for i, (_, k, _, future) in enumerate(batch):
+                if future.done():
+                    # client parti entre-temps
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    rows, scores = done.result()[i]
+                    future.set_result((rows[:k], scores[:k]))
+
+        task.add_done_callback(dispatch)
+
+    # ---- autres scorings ----
+
+    async def rank_profiles(self, vectors, top_k):
+        if not vectors:
+            return []
+        V = vstack([csr_matrix(v) for v in vectors]).tocsr()
+        return await self._submit(_worker_rank_profiles, V, top_k, [None] * V.shape[0])
+
+    async def rank_similar(self, article_id, top_k):
+        rows = rows_for_ids([article_id], self.articles_df, self.id_index)
+        if rows.size == 0:
+            raise ValueError("article_id inconnu")
+        return await self._submit(_worker_rank_similar, int(rows[0]), top_k)
+
+    async def hot_ranking(self, trend_service):
+        trends, version = trend_service.get()
+        cached = cached_hot_ranking(self.articles_df, version)
+        if cached is not None:
+            return cached
+        trends = tuple(t.lower() for t in trends)
+        trend_score, final_hot_score = await self._submit(_worker_hot_scores, trends)
+        return store_hot_ranking(self.articles_df, version, trends, trend_score, final_hot_score)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,183 @@
+import re
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+from src.config import (
+    SEARCH_FIELD_WEIGHTS, SEARCH_BM25_K1, SEARCH_BM25_B, SEARCH_PREFIX_EXPANSIONS,
+)
+from src.data_loading import article_abstracts
+from src.inverted_index import InvertedIndex
+
+# Fichiers dans le bundle d'artefacts
+SEARCH_FILES = {
+    "indptr": "S_indptr.npy",
+    "indices": "S_indices.npy",
+    "data": "S_data.npy",
+    "max_scores": "S_max.npy",
+    "terms": "S_terms.npy",
+    "df": "S_df.npy",
+}
+
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+
+class SearchIndex:
+    """
+    Index plein texte BM25 sur title / abstract / author / field.
+
+    Les poids BM25 ne dependent pas de la requete : ils sont precalcules pour
+    chaque (terme, article) et ranges en posting lists. Une recherche est donc un
+    top-k MaxScore (InvertedIndex) sur les seuls termes de la requete, avec :
+      - prefixe sur le dernier mot tape ("transf" -> transfer, transformer, ...)
+      - phrases entre guillemets verifiees sur le titre / l'abstract
+    """
+
+    def __init__(self, postings, terms, df):
+        self.postings = postings
+        self.terms = terms            # vocabulaire trie (tableau de str)
+        self.df = df                  # nb d'articles par terme (pour choisir les expansions de prefixe)
+        self._analyzer = CountVectorizer().build_analyzer()
+
+    @classmethod
+    def from_articles(cls, articles_df, abstracts=None, field_weights=SEARCH_FIELD_WEIGHTS,
+                      k1=SEARCH_BM25_K1, b=SEARCH_BM25_B):
+        texts = field_texts(articles_df, abstracts, field_weights)
+
+        # vocabulaire commun a tous les champs, termes tries
+        cv = CountVectorizer()
+        cv.fit(t for f in texts for t in texts[f])
+        terms = cv.get_feature_names_out()
+
+        tf = weighted_tf(cv, texts, field_weights)
+        dl = np.asarray(tf.sum(axis=1)).ravel()
+        avgdl = dl.mean() if len(dl) else 1.0
+
+        n_docs = tf.shape[0]
+        df = np.bincount(tf.indices, minlength=len(terms))
+        idf = bm25_idf(df, n_docs)
+        W = csr_matrix((bm25_impacts(tf, dl, avgdl, idf, k1, b), tf.indices, tf.indptr), shape=tf.shape)
+
+        return cls(InvertedIndex.from_matrix(W), np.asarray(terms, dtype=str), df.astype(np.int64))
+
+    # ---- requetes ----
+
+    def _term_id(self, term):
+        pos = np.searchsorted(self.terms, term)
+        if pos < len(self.terms) and self.terms[pos] == term:
+            return int(pos)
+        return None
+
+    def _prefix_ids(self, prefix):
+        """Termes commencant par prefix, les plus frequents d'abord (borne SEARCH_PREFIX_EXPANSIONS)."""
+        lo = np.searchsorted(self.terms, prefix, side="left")
+        hi = np.searchsorted(self.terms, prefix + "\uffff", side="left")
+        ids = np.arange(lo, hi)
+        if len(ids) > SEARCH_PREFIX_EXPANSIONS:
+            ids = ids[np.argsort(-self.df[ids], kind="stable")[:SEARCH_PREFIX_EXPANSIONS]]
+        return ids.tolist()
+
+    def parse(self, q):
+        """Requete -> (poids par terme, phrases a verifier)."""
+        phrases = [p.strip().lower() for p in _PHRASE_RE.findall(q) if p.strip()]
+        free_text = _PHRASE_RE.sub(" ", q)
+        tokens = self._analyzer(free_text)
+        # le dernier mot est un prefixe tant que l'utilisateur n'a pas tape d'espace
+        prefix = tokens.pop() if tokens and not q.endswith((" ", '"')) else None
+
+        weights = {}
+        for tok in tokens + [t for p in phrases for t in self._analyzer(p)]:
+            term = self._term_id(tok)
+            if term is not None:
+                weights[term] = weights.get(term, 0.0) + 1.0
+        if prefix is not None:
+            # le mot exact compte plein, les completions se partagent un poids de 1
+            exact = self._term_id(prefix)
+            expansions = [t for t in self._prefix_ids(prefix) if t != exact]
+            if exact is not None:
+                weights[exact] = weights.get(exact, 0.0) + 1.0
+            for term in expansions:
+                weights[term] = weights.get(term, 0.0) + 1.0 / len(expansions)
+        return weights, phrases
+
+    def search(self, q, articles_df, top_k=10, abstracts=None):
+        """
+        Retourne (rows, scores) classes par BM25, sans resultat a score nul.
+        abstracts : AbstractStore pour verifier les phrases dans l'abstract.
+        """
+        weights, phrases = self.parse(q)
+        if not weights:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        terms = np.fromiter(weights, dtype=np.int32)
+        v_query = csr_matrix(
+            (np.fromiter(weights.values(), dtype=np.float64), terms, [0, len(terms)]),
+            shape=(1, len(self.terms)),
+        )
+        # avec des phrases, on prend plus large puis on filtre
+        depth = top_k * 20 if phrases else top_k
+        rows, scores = self.postings.search(v_query, depth, pad=False)
+
+        if phrases:
+            keep = _contains_phrases(articles_df, rows, phrases, abstracts)
+            rows, scores = rows[keep], scores[keep]
+        return rows[:top_k], scores[:top_k]
+
+    # ---- persistance (bundle) ----
+
+    def save(self, path):
+        arrays = {
+            "indptr": self.postings.indptr,
+            "indices": self.postings.indices,
+            "data": self.postings.data,
+            "max_scores": self.postings.max_scores,
+            "terms": self.terms,
+            "df": self.df,
+        }
+        for key, filename in SEARCH_FILES.items():
+            np.save(path / filename, arrays[key])
+
+    @classmethod
+    def load(cls, path, n_docs, mmap=False):
+        if not all((path / f).exists() for f in SEARCH_FILES.values()):
+            return None
+        mmap_mode = "r" if mmap else None
+        a = {key: np.load(path / f, mmap_mode=mmap_mode) for key, f in SEARCH_FILES.items()}
+        postings = InvertedIndex(a["indptr"], a["indices"], a["data"], a["max_scores"], n_docs)
+        return cls(postings, a["terms"], a["df"])
+
+
+def field_texts(articles_df, abstracts=None, field_weights=SEARCH_FIELD_WEIGHTS):
+    """Texte de chaque champ indexe (NaN -> ""), dans l'ordre de field_weights."""
+    columns = {f: articles_df[f] for f in field_weights if f in articles_df.columns}
+    if "abstract" in field_weights:
+        columns["abstract"] = article_abstracts(articles_df, abstracts)
+    return {f: columns[f].astype(str).where(columns[f].notna(), "") for f in field_weights if f in columns}
+
+
+def weighted_tf(cv, texts, field_weights=SEARCH_FIELD_WEIGHTS):
+    """tf pondere par champ (BM25F simplifie), vocabulaire de cv."""
+    tf = None
+    for f, field in texts.items():
+        counts = cv.transform(field).astype(np.float64) * field_weights[f]
+        tf = counts if tf is None else tf + counts
+    return csr_matrix(tf)
+
+
+def bm25_idf(df, n_docs):
+    return np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+def bm25_impacts(tf, dl, avgdl, idf, k1=SEARCH_BM25_K1, b=SEARCH_BM25_B):
+    """Poids BM25 de chaque (article, terme) de tf ; dl : longueurs ponderees des lignes de tf."""
+    row_of = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+    norm = k1 * (1 - b + b * dl[row_of] / (avgdl or 1.0))
+    return idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)
+
+
+def _contains_phrases(articles_df, rows, phrases, abstracts=None):
+    """Masque des lignes dont le titre ou l'abstract contient toutes les phrases."""
+    subset = articles_df.iloc[rows]
+    # abstracts lus pour ces seules lignes (AbstractStore memory-mappe)
+    texts = (subset["title"].fillna("").astype(str) + " "
+             + article_abstracts(subset, abstracts).fillna("").astype(str)).str.lower()
+    return np.array([all(p in t for p in phrases) for t in texts], dtype=bool)
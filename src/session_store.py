@@ -0,0 +1,202 @@
+import os
+import re
+import time
+import uuid
+import numpy as np
+from scipy.sparse import csr_matrix
+from src.cache import LRUCache
+from src.config import PROFILE_ALPHA, SESSION_MAX, SESSION_TTL, SESSION_SPILL_DIR, SESSION_SHARED_DIR
+
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class SessionProfile:
+    """
+    Profil d'une session : vecteur de base (tags) + somme et nombre des
+    vecteurs likes. Un like = une addition, quel que soit le nombre de likes.
+    version : snapshot (modele) dans lequel les vecteurs ont ete calcules.
+    """
+
+    def __init__(self, base, tags_key=None, version=None):
+        self.base = csr_matrix(base)
+        self.tags_key = tags_key
+        self.version = version
+        self.liked_sum = csr_matrix(self.base.shape, dtype=self.base.dtype)
+        self.liked_count = 0
+        self.liked_ids = set()
+
+    def add_like(self, article_id, vec):
+        if article_id in self.liked_ids:
+            return False
+        self.liked_sum = self.liked_sum + vec
+        self.liked_count += 1
+        self.liked_ids.add(article_id)
+        return True
+
+    def rebased(self, base, X_tfidf, id_index, version=None):
+        """Meme session dans un nouveau snapshot : likes rejoues sur les lignes du nouveau X_tfidf."""
+        profile = SessionProfile(base, self.tags_key, version)
+        for article_id in self.liked_ids:
+            row = id_index.get(article_id)
+            if row is not None:
+                profile.add_like(article_id, X_tfidf[row])
+        return profile
+
+    def vector(self, alpha=PROFILE_ALPHA):
+        """Meme melange que update_profile_with_likes : alpha * base + (1 - alpha) * centroide."""
+        if self.liked_count == 0:
+            return self.base
+        # produit par un float (pas de division par un int) : le vecteur reste dans le dtype de X_tfidf
+        return alpha * self.base + (1 - alpha) * (self.liked_sum * (1.0 / self.liked_count))
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def is_valid_session_id(session_id):
+    return bool(session_id) and _SESSION_ID_RE.match(session_id) is not None
+
+
+class SessionProfileStore:
+    """
+    Profils de session en memoire (LRU + TTL). Si spill_dir est defini, les
+    sessions chassees par la LRU sont ecrites sur disque et rechargees au
+    prochain acces au lieu d'etre perdues.
+
+    Le store est propre au processus : avec plusieurs workers uvicorn, une
+    session ne suit pas les requetes envoyees a un autre worker. shared_dir
+    (dossier commun aux workers) rend les sessions partagees :
+      - put() ecrit la session dans shared_dir (fichier remplace d'un bloc)
+      - get() relit le fichier s'il a change depuis la copie en memoire
+        (like recu par un autre worker), la LRU ne sert plus que de cache
+      - TTL compte depuis la derniere ecriture, fichier expire supprime
+    Deux likes simultanes sur la meme session par deux workers : le dernier
+    ecrit gagne.
+    """
+
+    def __init__(self, maxsize=SESSION_MAX, ttl=SESSION_TTL, spill_dir=SESSION_SPILL_DIR,
+                 shared_dir=SESSION_SHARED_DIR):
+        self.ttl = ttl
+        self.shared_dir = shared_dir
+        self.spill_dir = spill_dir if shared_dir is None else None
+        for d in (self.spill_dir, self.shared_dir):
+            if d is not None:
+                d.mkdir(parents=True, exist_ok=True)
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl,
+                               on_evict=self._spill if self.spill_dir is not None else None)
+
+    def get(self, session_id):
+        if not is_valid_session_id(session_id):
+            return None
+        if self.shared_dir is not None:
+            return self._get_shared(session_id)
+        profile = self._cache.get(session_id)
+        if profile is None and self.spill_dir is not None:
+            profile = self._load_spilled(session_id)
+            if profile is not None:
+                self._cache.set(session_id, profile)
+        return profile
+
+    def put(self, session_id, profile):
+        if self.shared_dir is not None:
+            stamp = _write_profile(self._shared_path(session_id), profile)
+            if stamp is not None:
+                self._cache.set(session_id, (stamp, profile))
+            return
+        self._cache.set(session_id, profile)
+
+    def stats(self):
+        return self._cache.stats()
+
+    # ---- sessions partagees ----
+
+    def _shared_path(self, session_id):
+        return self.shared_dir / f"{session_id}.npz"
+
+    def _get_shared(self, session_id):
+        path = self._shared_path(session_id)
+        try:
+            stamp = _file_stamp(path)
+        except FileNotFoundError:
+            self._cache.pop(session_id)
+            return None
+        if self.ttl and time.time() - stamp[1] / 1e9 > self.ttl:
+            self._cache.pop(session_id)
+            path.unlink(missing_ok=True)
+            return None
+        cached = self._cache.get(session_id)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        # session modifiee par un autre worker (ou pas encore lue ici)
+        profile = _read_profile(path)
+        if profile is not None:
+            self._cache.set(session_id, (stamp, profile))
+        return profile
+
+    # ---- spill disque ----
+
+    def _spill_path(self, session_id):
+        return self.spill_dir / f"{session_id}.npz"
+
+    def _spill(self, session_id, profile):
+        _write_profile(self._spill_path(session_id), profile)
+
+    def _load_spilled(self, session_id):
+        path = self._spill_path(session_id)
+        if not path.exists():
+            return None
+        profile = _read_profile(path)
+        if profile is not None:
+            path.unlink()
+        return profile
+
+
+def _file_stamp(path):
+    """(inode, mtime) : change a chaque remplacement du fichier."""
+    st = path.stat()
+    return st.st_ino, st.st_mtime_ns
+
+
+def _write_profile(path, profile):
+    """Ecrit le profil (fichier temporaire puis os.replace) ; retourne le stamp du fichier ou None."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                shape=np.asarray(profile.base.shape),
+                base_data=profile.base.data, base_indices=profile.base.indices,
+                sum_data=profile.liked_sum.data, sum_indices=profile.liked_sum.indices,
+                liked_count=profile.liked_count,
+                liked_ids=np.asarray(sorted(profile.liked_ids), dtype=str),
+                tags_key=np.asarray(profile.tags_key or "", dtype=str),
+                version=np.asarray(profile.version or "", dtype=str),
+            )
+        os.replace(tmp, path)
+        return _file_stamp(path)
+    except Exception as e:
+        print("Erreur ecriture session:", e)
+        tmp.unlink(missing_ok=True)
+        return None
+
+
+def _read_profile(path):
+    try:
+        with np.load(path) as f:
+            shape = tuple(f["shape"])
+
+            def row(data, indices):
+                return csr_matrix((data, indices, [0, len(indices)]), shape=shape)
+
+            version = str(f["version"]) if "version" in f.files else ""
+            profile = SessionProfile(
+                row(f["base_data"], f["base_indices"]), str(f["tags_key"]) or None, version or None
+            )
+            profile.liked_sum = row(f["sum_data"], f["sum_indices"])
+            profile.liked_count = int(f["liked_count"])
+            profile.liked_ids = set(f["liked_ids"].tolist())
+        return profile
+    except Exception as e:
+        print("Erreur lecture session:", e)
+        return None
@@ -0,0 +1,125 @@
+import gc
+import threading
+from contextlib import contextmanager
+from src.artifacts import load_meta
+from src.config import SNAPSHOT_WATCH_INTERVAL
+
+
+class Snapshot:
+    """
+    Etat servi par l'API pour une version du corpus et du modele (articles,
+    X_tfidf, index, cartes, scorer, ...), jamais modifie une fois construit.
+    version : empreinte du bundle, sert de cle aux caches en aval.
+    """
+
+    def __init__(self, version, **state):
+        self.version = version
+        self.__dict__.update(state)
+        self.users = 0          # requetes en cours sur ce snapshot
+        self.retired = False    # remplace par un snapshot plus recent
+
+    def close(self):
+        """Libere le snapshot : pool de scoring arrete, tableaux (memoire / memory-maps) rendus."""
+        scorer = self.__dict__.get("scorer")
+        if scorer is not None:
+            scorer.close()
+        version = self.version
+        self.__dict__.clear()
+        self.version, self.users, self.retired = version, 0, True
+        gc.collect()
+
+
+class SnapshotManager:
+    """
+    Snapshot courant de l'API + rechargement a chaud.
+
+    - use() : une requete garde le snapshot du debut a la fin, meme si un
+      autre est publie entretemps
+    - reload() : chargement d'un nouveau snapshot dans un thread de fond, puis
+      remplacement d'un bloc (une affectation) ; un seul rechargement a la fois
+    - l'ancien snapshot est ferme (close) quand sa derniere requete se termine
+    - surveillance : meta.json du bundle relu toutes les `interval` secondes,
+      rechargement s'il a change (bundle republie par src.artifacts,
+      src.incremental, src.neighbors, ...)
+
+    loader() -> Snapshot ; on_swap(old, new) est appele apres chaque remplacement.
+    """
+
+    def __init__(self, loader, interval=SNAPSHOT_WATCH_INTERVAL, on_swap=None, path=None):
+        self._loader = loader
+        self.interval = interval
+        self.on_swap = on_swap
+        self.path = path
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._reloading = None
+        self._seen_meta = load_meta(path)
+        self.current = loader()
+
+    @contextmanager
+    def use(self):
+        with self._lock:
+            snapshot = self.current
+            snapshot.users += 1
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                snapshot.users -= 1
+                release = snapshot.retired and snapshot.users == 0
+            if release:
+                snapshot.close()
+
+    def swap(self, snapshot):
+        with self._lock:
+            old, self.current = self.current, snapshot
+            old.retired = True
+            release = old.users == 0
+        print(f"[INFO] Snapshot {old.version} -> {snapshot.version}")
+        if self.on_swap is not None:
+            self.on_swap(old, snapshot)
+        if release:
+            old.close()
+
+    def reload(self):
+        """Lance un rechargement en tache de fond ; False si un rechargement est deja en cours."""
+        with self._lock:
+            if self._reloading is not None and self._reloading.is_alive():
+                return False
+            self._reloading = threading.Thread(target=self._reload, name="snapshot-reload", daemon=True)
+            self._reloading.start()
+        return True
+
+    def _reload(self):
+        self._seen_meta = load_meta(self.path)
+        try:
+            snapshot = self._loader()
+        except Exception as e:
+            # on continue a servir le snapshot courant
+            print("Erreur chargement snapshot:", e)
+            return
+        self.swap(snapshot)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                meta = load_meta(self.path)
+                if meta is not None and meta != self._seen_meta:
+                    print("[INFO] Bundle d'artefacts modifie -> rechargement")
+                    self.reload()
+            except Exception as e:
+                print("Erreur surveillance bundle:", e)
+
+    def start(self):
+        if self.interval and (self._watcher is None or not self._watcher.is_alive()):
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="snapshot-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+        if self._reloading is not None:
+            self._reloading.join(timeout=5)
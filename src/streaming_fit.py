@@ -0,0 +1,369 @@
+import os
+from collections import Counter
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from src.artifacts import (
+    ABSTRACTS_FILE, ARTICLES_FILE, IDS_FILE, VECTORIZER_FILE,
+    X_DATA_FILE, X_INDICES_FILE, X_INDPTR_FILE,
+    POSTINGS_DATA_FILE, POSTINGS_INDICES_FILE, POSTINGS_INDPTR_FILE, POSTINGS_MAX_FILE,
+    bundle_dir, fingerprint_hasher, fingerprint_rows, load_articles_table, new_bundle_tmp,
+    publish_bundle,
+)
+from src.config import ARTICLES_PATH, TFIDF_STREAM_BATCH
+from src.data_loading import (
+    ARTICLE_COLUMNS, REQUIRED_COLUMNS, AbstractStore, article_texts, iter_articles, load_articles,
+)
+from src.search_index import SEARCH_FILES, bm25_idf, bm25_impacts, field_texts, weighted_tf
+from src.text_vectorizer import TFIDF_DTYPE, CompactTfidf, new_vectorizer, prune_vocabulary
+from src.trend_matcher import TOKEN_FILES, tokenize
+
+# Elements copies par morceau lors de la finalisation d'un .npy
+_COPY_CHUNK = 1 << 24
+
+
+class NpyWriter:
+    """
+    Tableau 1D .npy ecrit par morceaux : les valeurs vont d'abord dans un
+    fichier brut, l'en-tete .npy (qui contient la longueur) est ecrit a la
+    fermeture, puis les donnees recopiees par blocs (jamais tout en memoire).
+    """
+
+    def __init__(self, path, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._raw_path = path.with_name(path.name + ".raw")
+        self._raw = open(self._raw_path, "wb")
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        values.tofile(self._raw)
+        self.length += len(values)
+
+    def close(self, dtype=None):
+        """dtype : type final (ex. indptr int64 -> int32 une fois nnz connu)."""
+        self._raw.close()
+        out = np.lib.format.open_memmap(self.path, mode="w+", dtype=dtype or self.dtype, shape=(self.length,))
+        if self.length:
+            raw = np.memmap(self._raw_path, dtype=self.dtype, mode="r", shape=(self.length,))
+            for start in range(0, self.length, _COPY_CHUNK):
+                out[start:start + _COPY_CHUNK] = raw[start:start + _COPY_CHUNK]
+            del raw
+        out.flush()
+        del out
+        os.remove(self._raw_path)
+
+
+class ArrowWriter:
+    """Fichier Arrow IPC ecrit paquet par paquet, schema fixe par le premier paquet."""
+
+    def __init__(self, path):
+        self.path = path
+        self._sink = None
+        self._writer = None
+        self._schema = None
+
+    def append(self, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # categories propres a chaque paquet : stockees en texte, pas en dictionnaire
+        table = table.cast(pa.schema([
+            pa.field(f.name, f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+            for f in table.schema
+        ]))
+        if self._writer is None:
+            self._schema = table.schema
+            self._sink = pa.OSFile(str(self.path), "wb")
+            self._writer = pa.ipc.new_file(self._sink, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+
+
+class PostingsWriter:
+    """
+    Posting lists (vue CSC, comme InvertedIndex.from_matrix) ecrites hors
+    memoire depuis des lignes lues dans l'ordre : le nombre d'entrees par
+    colonne est connu d'avance (passe precedente), chaque paquet est range
+    directement a sa place dans les .npy memory-mappes (tri par comptage).
+    files : cles indptr / indices (+ data / max_scores si les entrees ont une valeur).
+    """
+
+    def __init__(self, path, files, counts, index_dtype, data_dtype=None):
+        counts = np.asarray(counts, dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        np.save(path / files["indptr"], indptr.astype(index_dtype))
+        self._next = indptr[:-1].copy()
+        self._files = {key: path / name for key, name in files.items()}
+        self.indices = np.lib.format.open_memmap(self._files["indices"], mode="w+", dtype=index_dtype,
+                                                 shape=(int(indptr[-1]),))
+        self.data = None
+        if data_dtype is not None:
+            self.data = np.lib.format.open_memmap(self._files["data"], mode="w+", dtype=data_dtype,
+                                                  shape=(int(indptr[-1]),))
+            self.max_scores = np.zeros(len(counts), dtype=data_dtype)
+
+    def append(self, rows, cols, values=None):
+        """Entrees (ligne, colonne[, valeur]) d'un paquet, lignes croissantes d'un paquet a l'autre."""
+        if len(cols) == 0:
+            return
+        order = np.argsort(cols, kind="stable")
+        cols = cols[order]
+        starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+        # rang dans la colonne = rang dans le paquet + entrees deja rangees
+        rank = np.arange(len(cols)) - np.repeat(starts, np.diff(np.r_[starts, len(cols)]))
+        dest = self._next[cols] + rank
+        self.indices[dest] = rows[order]
+        if self.data is not None:
+            values = values[order]
+            self.data[dest] = values
+            uniq = cols[starts]
+            self.max_scores[uniq] = np.maximum(self.max_scores[uniq], np.maximum.reduceat(values, starts))
+        self._next += np.bincount(cols, minlength=len(self._next))
+
+    def close(self):
+        self.indices.flush()
+        del self.indices
+        if self.data is not None:
+            self.data.flush()
+            del self.data
+            np.save(self._files["max_scores"], self.max_scores)
+
+
+def count_terms(batches, analyzer):
+    """
+    Passe 1 : comptes de chaque n-gramme sur des paquets d'articles.
+    Retourne (tf, df, n_docs) : occurrences totales, nb de documents, nb d'articles.
+    """
+    tf, df = Counter(), Counter()
+    n_docs = 0
+    for batch in batches:
+        for text in article_texts(batch):
+            tokens = analyzer(text)
+            tf.update(tokens)
+            df.update(set(tokens))
+            n_docs += 1
+    return tf, df, n_docs
+
+
+def select_vocabulary(tf, df, n_docs, params):
+    """
+    Elagage du vocabulaire compte (Counter tf / df) comme TfidfVectorizer.fit
+    (prune_vocabulary, partage avec le fit par shards).
+    Retourne (terms tries en bytes UTF-8, idf float32).
+    """
+    terms = sorted(tf)
+    tfs = np.fromiter((tf[t] for t in terms), dtype=np.int64, count=len(terms))
+    dfs = np.fromiter((df[t] for t in terms), dtype=np.int64, count=len(terms))
+    keep, idf = prune_vocabulary(tfs, dfs, n_docs, params)
+    encoded = np.array([terms[i].encode("utf-8") for i in keep], dtype=np.bytes_)
+    return encoded, idf
+
+
+def check_vocabulary(path=None, max_features=5000, batch_size=TFIDF_STREAM_BATCH):
+    """
+    Controle de la passe 1 : vocabulaire et idf de fit_streaming compares a
+    TfidfVectorizer sur le corpus entier (charge en memoire : a lancer sur un
+    echantillon), avec un max_features qui elague vraiment, donc des egalites
+    de tf a departager comme sklearn. ValueError au premier ecart.
+    """
+    if path is None:
+        path = ARTICLES_PATH
+    params = new_vectorizer().set_params(max_features=max_features).get_params()
+    tf, df, n_docs = count_terms(
+        iter_articles(path, REQUIRED_COLUMNS, batch_size), new_vectorizer().build_analyzer()
+    )
+    if len(tf) <= max_features:
+        raise ValueError(f"max_features={max_features} n'elague aucun terme ({len(tf)}) : controle sans objet")
+    terms, idf = select_vocabulary(tf, df, n_docs, params)
+    del tf, df
+
+    texts = article_texts(load_articles(path), AbstractStore.from_articles(path))
+    reference = CompactTfidf.from_vectorizer(TfidfVectorizer(**params).fit(texts))
+    if len(terms) != len(reference.terms) or not np.array_equal(terms, reference.terms):
+        missing = np.setdiff1d(reference.terms, terms)
+        raise ValueError(f"Vocabulaire different de TfidfVectorizer : {len(missing)} termes sur {max_features}")
+    if not np.array_equal(idf, reference.idf_):
+        raise ValueError("idf different de TfidfVectorizer")
+    print(f"[INFO] Vocabulaire identique a TfidfVectorizer ({max_features} termes sur {n_docs} articles)")
+
+
+def fit_streaming(path=None, out=None, batch_size=TFIDF_STREAM_BATCH):
+    """
+    Fit TF-IDF et bundle complet sans charger le corpus en memoire :
+      1) comptes (tf, df) paquet par paquet (title / abstract / field seulement)
+         puis elagage du vocabulaire -> CompactTfidf
+      2) transform paquet par paquet ; lignes CSR, metadonnees et
+         abstracts ajoutes aux fichiers du bundle au fil de l'eau
+      3) posting lists, index BM25 et corpus tokenise du trend_score relus
+         paquet par paquet depuis les fichiers ecrits (save_streaming_search_structures)
+    Meme vocabulaire, meme matrice, memes index et meme empreinte que build_artifacts.
+    """
+    if path is None:
+        path = ARTICLES_PATH
+    if out is None:
+        out = bundle_dir()
+
+    params = new_vectorizer().get_params()
+    tf, df, n_docs = count_terms(
+        iter_articles(path, REQUIRED_COLUMNS, batch_size), new_vectorizer().build_analyzer()
+    )
+    terms, idf = select_vocabulary(tf, df, n_docs, params)
+    del tf, df
+    vectorizer = CompactTfidf(terms, idf, params)
+    print(f"[INFO] Vocabulaire : {len(terms)} termes sur {n_docs} articles")
+
+    tmp = new_bundle_tmp(out)
+    data = NpyWriter(tmp / X_DATA_FILE, TFIDF_DTYPE)
+    indices = NpyWriter(tmp / X_INDICES_FILE, np.int32)
+    indptr = NpyWriter(tmp / X_INDPTR_FILE, np.int64)
+    articles = ArrowWriter(tmp / ARTICLES_FILE)
+    abstracts = ArrowWriter(tmp / ABSTRACTS_FILE)
+    hasher = fingerprint_hasher()
+    ids = []
+    nnz = 0
+
+    indptr.append([0])
+    for batch in iter_articles(path, ARTICLE_COLUMNS + ["abstract"], batch_size):
+        X = vectorizer.transform(article_texts(batch))
+        data.append(X.data)
+        indices.append(X.indices)
+        indptr.append(X.indptr[1:].astype(np.int64) + nnz)
+        nnz += X.nnz
+
+        hasher.update(fingerprint_rows(batch))
+        ids.extend(batch["id"].astype(str))
+        articles.append(batch.drop(columns=["abstract"]))
+        abstracts.append(batch[["abstract"]])
+
+    # meme regle que compact_matrix : index int32 tant que nnz le permet
+    index_dtype = np.int32 if nnz < np.iinfo(np.int32).max else np.int64
+    data.close()
+    indices.close(index_dtype)
+    indptr.close(index_dtype)
+    articles.close()
+    abstracts.close()
+    joblib.dump(vectorizer, tmp / VECTORIZER_FILE)
+    np.save(tmp / IDS_FILE, np.asarray(ids, dtype=str))
+    del ids
+
+    shape = (n_docs, len(terms))
+    save_streaming_search_structures(tmp, shape, index_dtype, batch_size)
+    return publish_bundle(tmp, out, hasher.hexdigest(), shape, nnz)
+
+
+def _bundle_batches(tmp, batch_size):
+    """Paquets (articles, abstracts) relus dans les fichiers Arrow memory-mappes du bundle en cours."""
+    articles = load_articles_table(tmp)
+    abstracts = AbstractStore.from_arrow(tmp / ABSTRACTS_FILE)
+    for start in range(0, len(articles), batch_size):
+        yield articles.iloc[start:start + batch_size], abstracts
+
+
+def save_streaming_search_structures(tmp, shape, index_dtype, batch_size=TFIDF_STREAM_BATCH):
+    """
+    Memes fichiers que save_search_structures (P_*, S_*, T_*), construits
+    paquet par paquet depuis les fichiers deja ecrits dans tmp : matrice CSR
+    et Arrow memory-mappes, seuls des tableaux par terme / par article
+    (vocabulaires, comptes, longueurs) restent en memoire.
+    """
+    X = csr_matrix(
+        (
+            np.load(tmp / X_DATA_FILE, mmap_mode="r"),
+            np.load(tmp / X_INDICES_FILE, mmap_mode="r"),
+            np.load(tmp / X_INDPTR_FILE, mmap_mode="r"),
+        ),
+        shape=shape,
+        copy=False,
+    )
+    row_blocks = range(0, shape[0], batch_size)
+
+    # posting lists de X : comptes par terme, puis lignes rangees par terme
+    counts = np.zeros(shape[1], dtype=np.int64)
+    for start in row_blocks:
+        counts += np.bincount(X[start:start + batch_size].indices, minlength=shape[1])
+    postings = PostingsWriter(tmp, {
+        "indptr": POSTINGS_INDPTR_FILE, "indices": POSTINGS_INDICES_FILE,
+        "data": POSTINGS_DATA_FILE, "max_scores": POSTINGS_MAX_FILE,
+    }, counts, index_dtype, X.dtype)
+    for start in row_blocks:
+        block = X[start:start + batch_size]
+        rows = np.repeat(np.arange(start, start + block.shape[0], dtype=index_dtype), np.diff(block.indptr))
+        postings.append(rows, block.indices, block.data)
+    postings.close()
+    del X
+
+    # passe 1 : vocabulaires de l'index BM25 et du corpus tokenise
+    analyzer = CountVectorizer().build_analyzer()
+    search_terms = set()
+    token_counts = Counter()
+    for batch, abstracts in _bundle_batches(tmp, batch_size):
+        for field in field_texts(batch, abstracts).values():
+            for text in field:
+                search_terms.update(analyzer(text))
+        for tokens in tokenize(article_texts(batch, abstracts)):
+            token_counts.update(tokens)
+    cv = CountVectorizer(vocabulary=sorted(search_terms))
+    del search_terms
+    vocab = pd.Index(sorted(token_counts))
+    token_counts = np.fromiter((token_counts[t] for t in vocab), dtype=np.int64, count=len(vocab))
+
+    # passe 2 : longueurs et df BM25 ; tokens du corpus ecrits, positions rangees par token
+    n_docs = shape[0]
+    dl = np.zeros(n_docs, dtype=np.float64)
+    df = np.zeros(len(cv.vocabulary), dtype=np.int64)
+    token_ids = NpyWriter(tmp / TOKEN_FILES["token_ids"], np.int32)
+    offsets = NpyWriter(tmp / TOKEN_FILES["offsets"], np.int64)
+    positions = PostingsWriter(tmp, {"indptr": TOKEN_FILES["token_starts"], "indices": TOKEN_FILES["positions"]},
+                               token_counts, np.int64)
+    n_tokens = 0
+    offsets.append([0])
+    for batch, abstracts in _bundle_batches(tmp, batch_size):
+        tf = weighted_tf(cv, field_texts(batch, abstracts))
+        dl[batch.index] = np.asarray(tf.sum(axis=1)).ravel()
+        df += np.bincount(tf.indices, minlength=len(df))
+
+        tokens = tokenize(article_texts(batch, abstracts))
+        ids = vocab.get_indexer(tokens.explode().dropna()).astype(np.int32)
+        token_ids.append(ids)
+        offsets.append(np.cumsum(tokens.str.len().to_numpy(dtype=np.int64)) + n_tokens)
+        positions.append(np.arange(n_tokens, n_tokens + len(ids), dtype=np.int64), ids)
+        n_tokens += len(ids)
+    token_ids.close()
+    offsets.close()
+    positions.close()
+    np.save(tmp / TOKEN_FILES["vocab"], np.asarray(vocab, dtype=str))
+    del vocab, token_counts
+
+    # passe 3 : poids BM25 (avgdl et idf connus) ranges en posting lists
+    avgdl = dl.mean() if n_docs else 1.0
+    idf = bm25_idf(df, n_docs)
+    search_dtype = np.int32 if df.sum() < np.iinfo(np.int32).max else np.int64
+    search = PostingsWriter(tmp, {
+        "indptr": SEARCH_FILES["indptr"], "indices": SEARCH_FILES["indices"],
+        "data": SEARCH_FILES["data"], "max_scores": SEARCH_FILES["max_scores"],
+    }, df, search_dtype, np.float64)
+    for batch, abstracts in _bundle_batches(tmp, batch_size):
+        tf = weighted_tf(cv, field_texts(batch, abstracts))
+        rows = np.repeat(batch.index.to_numpy(dtype=search_dtype), np.diff(tf.indptr))
+        search.append(rows, tf.indices, bm25_impacts(tf, dl[batch.index], avgdl, idf))
+    search.close()
+    np.save(tmp / SEARCH_FILES["terms"], np.asarray(cv.get_feature_names_out(), dtype=str))
+    np.save(tmp / SEARCH_FILES["df"], df)
+
+if __name__ == "__main__":
+    # Build hors memoire : python -m src.streaming_fit [chemin .parquet / .csv]
+    # Controle du vocabulaire : python -m src.streaming_fit --check [chemin] [max_features]
+    import sys
+    args = sys.argv[1:]
+    if args[:1] == ["--check"]:
+        check_vocabulary(args[1] if len(args) > 1 else None, *(int(a) for a in args[2:3]))
+    else:
+        meta = fit_streaming(args[0] if args else None)
+        print(f"Bundle ecrit dans {bundle_dir()} : {meta['n_docs']} docs x {meta['n_features']} features")
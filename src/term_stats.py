@@ -0,0 +1,139 @@
+import os
+import re
+from functools import lru_cache
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from nltk.corpus import stopwords
+from src.config import TERM_STATS_PATH
+from src.data_loading import article_texts
+
+# empreinte du corpus compte (corpus_fingerprint), dans les metadonnees du parquet
+FINGERPRINT_KEY = b"corpus_fingerprint"
+
+
+@lru_cache(maxsize=1)
+def _stopwords() -> frozenset:
+    # charge une seule fois (avant : stopwords.words() + recherche en liste a chaque document)
+    return frozenset(stopwords.words("english"))
+
+
+def simple_tokenize(text: str) -> list[str]:
+    text = text.lower()
+    # virer ce qui n'est pas str
+    text = re.sub(r"[^a-zA-Z0-9\s]", " ", text)
+    tokens = text.split()
+    # mots vides minimalistes
+    sw = _stopwords()
+    tokens = [t for t in tokens if len(t) > 3 and t not in sw]
+    return tokens
+
+
+def build_term_stats(articles_df: pd.DataFrame, abstracts=None) -> pd.DataFrame:
+    """
+    Table des comptes de termes par (year, field, term), construite a l'ingestion.
+    Colonnes : year, field, term, count.
+    abstracts : AbstractStore si articles_df n'a pas de colonne abstract.
+    """
+    df = articles_df.dropna(subset=["year"])
+    texts = article_texts(df, abstracts)
+
+    tokens = texts.astype(str).map(simple_tokenize)
+    exploded = pd.DataFrame({
+        "year": df["year"].astype(int).to_numpy(),
+        "field": df["field"].astype(str).to_numpy(),
+        "term": tokens.to_numpy(),
+    }).explode("term").dropna(subset=["term"])
+
+    stats = exploded.groupby(["year", "field", "term"], sort=False).size()
+    return stats.rename("count").reset_index()
+
+
+def update_term_stats(stats: pd.DataFrame, new_articles_df: pd.DataFrame, abstracts=None) -> pd.DataFrame:
+    """
+    Ajoute les comptes des NOUVEAUX articles seulement (pas de rescan du corpus).
+    """
+    if stats is None or stats.empty:
+        return build_term_stats(new_articles_df, abstracts)
+    new_stats = build_term_stats(new_articles_df, abstracts)
+    merged = pd.concat([stats, new_stats], ignore_index=True)
+    return merged.groupby(["year", "field", "term"], sort=False)["count"].sum().reset_index()
+
+
+def top_terms(stats: pd.DataFrame, n_terms: int = 10, recent_years: int = 3, field=None) -> list[str]:
+    """
+    Termes les plus frequents sur les `recent_years` dernieres annees
+    (optionnellement pour un seul field) : simple agregation de la table.
+    """
+    if field is not None:
+        stats = stats[stats["field"] == field]
+    if stats.empty:
+        return []
+    cutoff = stats["year"].max() - recent_years + 1
+    recent = stats[stats["year"] >= cutoff]
+    totals = recent.groupby("term", sort=False)["count"].sum()
+    return totals.nlargest(n_terms).index.tolist()
+
+
+def save_term_stats(stats: pd.DataFrame, path=None, fingerprint=None) -> None:
+    """
+    Ecrit la table (fichier temporaire puis os.replace : l'API ne lit jamais
+    un fichier a moitie ecrit). fingerprint : empreinte du corpus compte
+    (corpus_fingerprint / meta.json du bundle), verifiee par load_term_stats.
+    """
+    if path is None:
+        path = TERM_STATS_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(stats, preserve_index=False)
+    if fingerprint is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), FINGERPRINT_KEY: fingerprint.encode()})
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def term_stats_fingerprint(path=None):
+    """Empreinte du corpus dont la table est issue (None si absente ou table sans empreinte)."""
+    if path is None:
+        path = TERM_STATS_PATH
+    try:
+        value = (pq.read_schema(path).metadata or {}).get(FINGERPRINT_KEY)
+    except Exception:
+        return None
+    return value.decode() if value is not None else None
+
+
+def load_term_stats(path=None, fingerprint=None):
+    """
+    Table persistee, ou None si elle n'a pas encore ete construite.
+    fingerprint : empreinte du corpus servi ; une table construite sur un autre
+    corpus (ou sans empreinte) est ignoree -> None, tendances calculees sur le corpus.
+    """
+    if path is None:
+        path = TERM_STATS_PATH
+    if not path.exists():
+        return None
+    if fingerprint is not None and term_stats_fingerprint(path) != fingerprint:
+        print("[INFO] Stats de termes d'un autre corpus -> ignorees (python -m src.term_stats pour les reconstruire)")
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print("Erreur lecture stats de termes:", e)
+        return None
+
+
+if __name__ == "__main__":
+    # (Re)construction complete : python -m src.term_stats
+    from src.artifacts import corpus_fingerprint, load_abstract_store, load_articles_table, load_meta
+    from src.data_loading import AbstractStore, load_articles
+    meta = load_meta()
+    if meta is not None:
+        # corpus servi par l'API : bundle courant (ajouts src.incremental compris)
+        articles_df, abstracts, fingerprint = load_articles_table(), load_abstract_store(), meta["fingerprint"]
+    else:
+        articles_df, abstracts = load_articles(), AbstractStore.from_articles()
+        fingerprint = corpus_fingerprint(articles_df, abstracts)
+    stats = build_term_stats(articles_df, abstracts)
+    save_term_stats(stats, fingerprint=fingerprint)
+    print(f"{len(stats)} lignes (year, field, term) ecrites dans {TERM_STATS_PATH}")
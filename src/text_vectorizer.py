@@ -1,18 +1,296 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.preprocessing import normalize
 import numpy as np
-from src.config import EMB_PATH, TFIDF_MAX_FEATURES, TFIDF_NGRAM_RANGE, TFIDF_STOP_WORDS, LLM_URL
+import pandas as pd
+from scipy.sparse import csr_matrix
+from src.config import (
+    EMB_PATH, TFIDF_MAX_FEATURES, TFIDF_NGRAM_RANGE, TFIDF_STOP_WORDS, LLM_URL,
+    TFIDF_N_JOBS, TFIDF_SHARD_MIN_DOCS,
+)
 
-def fit_vectorizer(corpus):
-    vectorizer = TfidfVectorizer(
+# Type des poids TF-IDF servis (matrice, idf, vecteurs de profil)
+TFIDF_DTYPE = np.float32
+
+
+class CompactTfidf:
+    """
+    Forme de service d'un TfidfVectorizer fitte, sans dict Python :
+      - terms : vocabulaire trie en tableau numpy de bytes UTF-8 ; la colonne
+        d'un terme est sa position (sklearn numerote deja les termes dans
+        l'ordre alphabetique), transform = recherche binaire (searchsorted)
+      - idf_ : float32
+      - params : parametres du vectorizer, l'analyseur (tokens + n-grammes)
+        est reconstruit a partir d'eux ; ni vocabulary_ ni stop_words_
+        (termes elagues par max_features, inutiles pour servir) ne sont gardes
+    transform() donne la meme matrice que TfidfVectorizer.transform, en float32.
+    """
+
+    def __init__(self, terms, idf, params):
+        self.terms = terms
+        self.idf_ = idf
+        self.params = params
+        self._analyzer = None
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        terms = np.empty(len(vectorizer.vocabulary_), dtype=object)
+        for term, col in vectorizer.vocabulary_.items():
+            terms[col] = term.encode("utf-8")
+        terms = terms.astype(np.bytes_)
+        if len(terms) > 1 and not np.all(terms[:-1] < terms[1:]):
+            raise ValueError("vocabulaire non trie : colonnes incompatibles avec searchsorted")
+        params = vectorizer.get_params()
+        params["dtype"] = TFIDF_DTYPE
+        return cls(terms, np.asarray(vectorizer.idf_, dtype=TFIDF_DTYPE), params)
+
+    def __getstate__(self):
+        # l'analyseur (closures sklearn) est reconstruit au premier transform
+        state = dict(self.__dict__)
+        state["_analyzer"] = None
+        return state
+
+    def build_analyzer(self):
+        if self._analyzer is None:
+            self._analyzer = TfidfVectorizer(**self.params).build_analyzer()
+        return self._analyzer
+
+    def get_feature_names_out(self):
+        return np.char.decode(self.terms, "utf-8").astype(object)
+
+    @property
+    def n_features(self):
+        return len(self.terms)
+
+    def _weights(self, texts):
+        """(data, indices, indptr) des comptes, lignes triees par colonne."""
+        analyzer = self.build_analyzer()
+        width = self.terms.dtype.itemsize
+        doc_ids, keys = [], []
+        n_docs = 0
+        for i, doc in enumerate(texts):
+            n_docs += 1
+            for token in analyzer(doc):
+                key = token.encode("utf-8")
+                # plus long que le plus long terme : hors vocabulaire
+                if len(key) <= width:
+                    keys.append(key)
+                    doc_ids.append(i)
+
+        keys = np.array(keys, dtype=self.terms.dtype)
+        pos = np.searchsorted(self.terms, keys)
+        pos[pos == len(self.terms)] = 0
+        hit = self.terms[pos] == keys if len(self.terms) else np.zeros(len(keys), dtype=bool)
+
+        # un seul np.unique sur (ligne, colonne) : comptes deja tries comme une CSR
+        cells, counts = np.unique(
+            np.asarray(doc_ids, dtype=np.int64)[hit] * len(self.terms) + pos[hit], return_counts=True
+        )
+        rows = cells // max(len(self.terms), 1)
+        indices = (cells - rows * len(self.terms)).astype(np.int32)
+        indptr = np.zeros(n_docs + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=n_docs), out=indptr[1:])
+        return counts.astype(TFIDF_DTYPE), indices, indptr
+
+    def count(self, texts):
+        """Comptes (n_docs, D) comme CountVectorizer.transform."""
+        data, indices, indptr = self._weights(texts)
+        return csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(self.terms)))
+
+    def raw_tfidf(self, texts):
+        data, indices, indptr = self._weights(texts)
+        if self.params.get("sublinear_tf"):
+            np.log(data, out=data)
+            data += 1
+        if self.params.get("use_idf", True):
+            data *= self.idf_[indices]
+        return csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(self.terms)))
+
+    def transform(self, texts):
+        X = self.raw_tfidf(texts)
+        norm = self.params.get("norm")
+        if norm == "l2":
+            # normalisation en place (meme resultat que sklearn normalize, sans ses validations)
+            row_of = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+            norms = np.sqrt(np.bincount(row_of, weights=X.data * X.data, minlength=X.shape[0]))
+            X.data /= norms[row_of].astype(TFIDF_DTYPE)
+        elif norm:
+            X = normalize(X, norm=norm, copy=False)
+        return X
+
+
+def compact_matrix(X):
+    """CSR float32, indices int32 (int64 seulement si nnz depasse 2**31)."""
+    X = csr_matrix(X, dtype=TFIDF_DTYPE)
+    index_dtype = np.int32 if X.nnz < np.iinfo(np.int32).max else np.int64
+    X.indices = X.indices.astype(index_dtype, copy=False)
+    X.indptr = X.indptr.astype(index_dtype, copy=False)
+    return X
+
+
+def new_vectorizer():
+    """TfidfVectorizer non fitte avec les parametres du projet."""
+    return TfidfVectorizer(
         max_features=TFIDF_MAX_FEATURES,
         ngram_range=TFIDF_NGRAM_RANGE,
         stop_words=TFIDF_STOP_WORDS,
+        dtype=TFIDF_DTYPE,
+    )
+
+
+def prune_vocabulary(tfs, dfs, n_docs, params):
+    """
+    Elagage comme TfidfVectorizer.fit sur des comptes alignes sur le
+    vocabulaire trie : bornes min_df / max_df, puis les max_features plus
+    frequents, avec le meme tri que CountVectorizer._limit_features (argsort
+    par defaut sur -tf dans le dtype de la matrice) : memes termes gardes en
+    cas d'egalite de tf.
+    Retourne (positions gardees, idf float32).
+    """
+    max_df, min_df = params["max_df"], params["min_df"]
+    max_doc = max_df if isinstance(max_df, (int, np.integer)) else max_df * n_docs
+    min_doc = min_df if isinstance(min_df, (int, np.integer)) else min_df * n_docs
+    keep = np.flatnonzero((dfs <= max_doc) & (dfs >= min_doc))
+    max_features = params["max_features"]
+    if max_features is not None and len(keep) > max_features:
+        # binary : sklearn compte chaque terme une fois par document
+        tfs = (dfs if params["binary"] else tfs).astype(params["dtype"])
+        keep = keep[np.sort((-tfs[keep]).argsort()[:max_features])]
+    if not len(keep):
+        raise ValueError("Aucun terme apres elagage : min_df / max_df trop stricts")
+
+    # idf lisse comme TfidfTransformer (calcul dans le dtype de la matrice)
+    smooth = int(params["smooth_idf"])
+    doc_freq = dfs[keep].astype(TFIDF_DTYPE) + smooth
+    idf = (np.log((n_docs + smooth) / doc_freq) + 1).astype(TFIDF_DTYPE)
+    return keep, idf
+
+
+def _count_shard(params, texts):
+    """Comptes d'un shard, tokenise une seule fois : (termes tries, comptes CSR sur ces termes)."""
+    counter = TfidfVectorizer(**params).set_params(max_features=None, min_df=1, max_df=1.0)
+    counts = CountVectorizer.fit_transform(counter, texts)
+    return counter.get_feature_names_out(), counts
+
+
+def fit_sharded(texts, n_shards, vectorizer=None):
+    """
+    Fit TF-IDF reparti sur n_shards processus (joblib), meme resultat que
+    vectorizer.fit_transform (TfidfVectorizer du projet par defaut) :
+      1) chaque shard (tranche contigue de documents) est tokenise une fois :
+         vocabulaire du shard + matrice de comptes
+      2) union des vocabulaires (un hachage de tous les termes, un seul tri
+         des termes distincts), somme des comptes tf / df, elagage et idf
+         comme TfidfVectorizer (prune_vocabulary)
+      3) colonnes de chaque shard renumerotees dans le vocabulaire final
+         (termes elagues retires), blocs empiles dans l'ordre, puis poids et
+         normalisation par le TfidfTransformer de sklearn
+    Retourne (CompactTfidf, X float32).
+    """
+    params = (new_vectorizer() if vectorizer is None else vectorizer).get_params()
+    texts = list(texts)
+    bounds = np.linspace(0, len(texts), n_shards + 1).astype(int)
+    shards = Parallel(n_jobs=n_shards)(
+        delayed(_count_shard)(params, texts[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])
     )
+
+    # union des vocabulaires : un seul hachage de tous les termes (factorize),
+    # puis un seul tri des termes distincts -> colonne globale de chaque terme de shard
+    codes, uniques = pd.factorize(np.concatenate([terms for terms, _ in shards]))
+    uniques = uniques.tolist()
+    order = np.array(sorted(range(len(uniques)), key=uniques.__getitem__), dtype=np.int64)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    columns = np.split(rank[codes], np.cumsum([len(terms) for terms, _ in shards])[:-1])
+    del codes, rank
+    tfs = np.zeros(len(order), dtype=np.int64)
+    dfs = np.zeros(len(order), dtype=np.int64)
+    for cols, (_, counts) in zip(columns, shards):
+        tfs[cols] += np.bincount(counts.indices, weights=counts.data, minlength=len(cols)).astype(np.int64)
+        dfs[cols] += np.bincount(counts.indices, minlength=len(cols))
+
+    keep, idf = prune_vocabulary(tfs, dfs, len(texts), params)
+    new_column = np.full(len(order), -1, dtype=np.int64)
+    new_column[keep] = np.arange(len(keep))
+    data, indices, lengths = [], [], []
+    for cols, (_, counts) in zip(columns, shards):
+        mapped = new_column[cols[counts.indices]]
+        kept = mapped >= 0
+        row_of = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        data.append(counts.data[kept])
+        indices.append(mapped[kept])
+        lengths.append(np.bincount(row_of[kept], minlength=counts.shape[0]))
+    del shards
+    indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(np.concatenate(lengths), out=indptr[1:])
+    counts = csr_matrix((np.concatenate(data), np.concatenate(indices), indptr), shape=(len(texts), len(keep)))
+
+    transformer = TfidfTransformer(
+        norm=params["norm"], use_idf=params["use_idf"],
+        smooth_idf=params["smooth_idf"], sublinear_tf=params["sublinear_tf"],
+    )
+    if params["use_idf"]:
+        transformer.idf_ = idf
+    X = transformer.transform(counts, copy=False)
+
+    terms = np.array([uniques[i].encode("utf-8") for i in order[keep]], dtype=np.bytes_)
+    params["dtype"] = TFIDF_DTYPE
+    return CompactTfidf(terms, idf, params), compact_matrix(X)
+
+
+def fit_vectorizer(corpus, n_jobs=TFIDF_N_JOBS, shard_min_docs=TFIDF_SHARD_MIN_DOCS):
+    """
+    Fit TF-IDF puis passage a la forme compacte : (CompactTfidf, X float32).
+    Gros corpus : fit reparti sur les coeurs (fit_sharded), au plus un shard
+    par tranche de shard_min_docs documents ; sinon TfidfVectorizer directement.
+    """
+    n_shards = min(effective_n_jobs(n_jobs), len(corpus) // max(shard_min_docs, 1))
+    if n_shards > 1:
+        return fit_sharded(corpus, n_shards)
+    vectorizer = new_vectorizer()
     X = vectorizer.fit_transform(corpus)
-    return vectorizer, X
+    return CompactTfidf.from_vectorizer(vectorizer), compact_matrix(X)
+
+
+def check_sharded_fit(corpus, n_shards=4, max_features=None):
+    """
+    Controle de fit_sharded : vocabulaire, idf et matrice compares a
+    TfidfVectorizer.fit_transform sur le meme corpus (max_features : pour
+    forcer un elagage et ses egalites de tf). ValueError au premier ecart.
+    """
+    vectorizer = new_vectorizer()
+    if max_features is not None:
+        vectorizer.set_params(max_features=max_features)
+    compact, X = fit_sharded(corpus, n_shards, vectorizer)
+    X_ref = compact_matrix(vectorizer.fit_transform(corpus))
+    reference = CompactTfidf.from_vectorizer(vectorizer)
+    if not np.array_equal(compact.terms, reference.terms):
+        raise ValueError(f"Vocabulaire different de TfidfVectorizer ({len(compact.terms)} / {len(reference.terms)} termes)")
+    if not np.array_equal(compact.idf_, reference.idf_):
+        raise ValueError("idf different de TfidfVectorizer")
+    X.sort_indices()
+    X_ref.sort_indices()
+    if not (np.array_equal(X.indptr, X_ref.indptr) and np.array_equal(X.indices, X_ref.indices)):
+        raise ValueError("Matrice TF-IDF : structure differente de TfidfVectorizer")
+    diff = np.abs(X.data - X_ref.data).max() if X.nnz else 0.0
+    if diff:
+        raise ValueError(f"Matrice TF-IDF : ecart max {diff:.3g} avec TfidfVectorizer")
+    print(f"[INFO] fit sur {n_shards} shards identique a TfidfVectorizer ({X.shape[0]} docs x {X.shape[1]} termes)")
+
+def raw_tfidf(vectorizer, texts):
+    """
+    Poids tf * idf NON normalises (la normalisation L2 est faite par l'appelant).
+    Additifs : raw_tfidf(a + " " + b) ~= raw_tfidf(a) + raw_tfidf(b)
+    (aux bigrammes a cheval sur la jointure pres).
+    """
+    if isinstance(vectorizer, CompactTfidf):
+        return vectorizer.raw_tfidf(texts)
+    counts = CountVectorizer.transform(vectorizer, texts)
+    return counts.multiply(vectorizer.idf_).tocsr()
 
 def compute_embeddings(texts):
+    # import ici : les workers du fit par shards importent ce module sans charger torch
+    from sentence_transformers import SentenceTransformer
     print("Loading sentence-transformer model...")
     model = SentenceTransformer(LLM_URL)
 
@@ -28,3 +306,14 @@ def compute_embeddings(texts):
     os.makedirs(os.path.dirname(EMB_PATH), exist_ok=True)
     np.save(EMB_PATH, embeddings)
     return embeddings
+
+
+if __name__ == "__main__":
+    # Controle du fit par shards : python -m src.text_vectorizer --check [chemin] [n_shards] [max_features]
+    import sys
+    from src.data_loading import AbstractStore, article_texts, load_articles
+    args = sys.argv[1:]
+    if args[:1] == ["--check"]:
+        path = args[1] if len(args) > 1 else None
+        texts = article_texts(load_articles(path), AbstractStore.from_articles(path))
+        check_sharded_fit(texts, *(int(a) for a in args[2:4]))
@@ -0,0 +1,126 @@
+import re
+import numpy as np
+import pandas as pd
+from src.data_loading import article_texts
+
+# tokens alphanumeriques en minuscules (la ponctuation des titres arXiv est ignoree)
+TOKEN_PATTERN = r"[a-z0-9]+"
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+# Fichiers dans le bundle d'artefacts
+TOKEN_FILES = {
+    "vocab": "T_vocab.npy",
+    "token_ids": "T_tokens.npy",
+    "offsets": "T_offsets.npy",
+    "positions": "T_positions.npy",
+    "token_starts": "T_starts.npy",
+}
+
+
+class TokenCorpus:
+    """
+    Corpus pre-tokenise une fois pour toutes : tous les tokens du corpus dans un
+    seul tableau d'entiers (docs concatenes), plus un index token -> positions.
+    Chercher une phrase ne coute que le nombre d'occurrences de son token le
+    plus rare, pas la taille du corpus.
+    Construit avec le bundle (T_*.npy) et memory-mappe par les workers : une
+    seule copie en RAM (page cache) quel que soit le nombre de processus.
+    """
+
+    def __init__(self, vocab, token_ids, offsets, positions, token_starts):
+        self.vocab = vocab                # vocabulaire trie (tableau de str)
+        self.token_ids = token_ids
+        self.offsets = offsets
+        self.n_docs = len(offsets) - 1
+        self.positions = positions
+        self.token_starts = token_starts
+
+    @classmethod
+    def from_texts(cls, texts):
+        tokens = tokenize(texts)
+        lengths = tokens.str.len().to_numpy(dtype=np.int64)
+        flat = tokens.explode().dropna()
+
+        codes, vocab = pd.factorize(flat, sort=True)
+        token_ids = codes.astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        # positions regroupees par token (tri stable -> positions croissantes)
+        positions = np.argsort(token_ids, kind="stable").astype(np.int64)
+        counts = np.bincount(token_ids, minlength=len(vocab))
+        token_starts = np.concatenate([[0], np.cumsum(counts)])
+        return cls(np.asarray(vocab, dtype=str), token_ids, offsets, positions, token_starts)
+
+    # ---- persistance (bundle) ----
+
+    def save(self, path):
+        for key, filename in TOKEN_FILES.items():
+            np.save(path / filename, getattr(self, key))
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        if not all((path / f).exists() for f in TOKEN_FILES.values()):
+            return None
+        mmap_mode = "r" if mmap else None
+        return cls(**{key: np.load(path / f, mmap_mode=mmap_mode) for key, f in TOKEN_FILES.items()})
+
+    def encode(self, phrase):
+        """Phrase -> ids de tokens, ou None si un token n'apparait jamais dans le corpus."""
+        toks = _TOKEN_RE.findall(phrase.lower())
+        if not toks:
+            return None
+        ids = np.searchsorted(self.vocab, toks)
+        if (ids >= len(self.vocab)).any() or (self.vocab[ids] != toks).any():
+            return None
+        return ids
+
+    def docs_containing(self, phrase_ids):
+        """Documents qui contiennent la suite de tokens phrase_ids (sans doublon)."""
+        L = len(phrase_ids)
+        freqs = self.token_starts[phrase_ids + 1] - self.token_starts[phrase_ids]
+        pivot = int(np.argmin(freqs))
+        tok = phrase_ids[pivot]
+        starts = self.positions[self.token_starts[tok]:self.token_starts[tok + 1]] - pivot
+
+        n_tokens = len(self.token_ids)
+        starts = starts[(starts >= 0) & (starts + L <= n_tokens)]
+        for m in range(L):
+            if m == pivot or len(starts) == 0:
+                continue
+            starts = starts[self.token_ids[starts + m] == phrase_ids[m]]
+
+        # la phrase ne doit pas chevaucher deux documents
+        docs = np.searchsorted(self.offsets, starts, side="right") - 1
+        inside = starts + L <= self.offsets[docs + 1]
+        return np.unique(docs[inside])
+
+
+def tokenize(texts):
+    """Textes -> listes de tokens (Series), comme TokenCorpus.from_texts."""
+    return pd.Series(texts).fillna("").astype(str).str.lower().str.findall(TOKEN_PATTERN)
+
+
+def build_token_corpus(articles_df, abstracts=None):
+    """Corpus pre-tokenise pour le trend_score : title + abstract + field de chaque article."""
+    if abstracts is None and "abstract" not in articles_df.columns:
+        # sans abstracts les tendances ne matcheraient que sur les titres
+        raise ValueError("Abstracts requis pour le trend_score : AbstractStore ou colonne abstract")
+    return TokenCorpus.from_texts(article_texts(articles_df, abstracts))
+
+
+def compile_trends(trends, token_corpus):
+    """Jeu de tendances -> liste de phrases encodees (celles qui ne peuvent pas matcher sont ignorees)."""
+    compiled = []
+    for t in trends:
+        ids = token_corpus.encode(t)
+        if ids is not None:
+            compiled.append(ids)
+    return compiled
+
+
+def count_trend_matches(token_corpus, compiled_trends):
+    """Nombre de tendances distinctes presentes dans chaque document."""
+    scores = np.zeros(token_corpus.n_docs, dtype=float)
+    for phrase_ids in compiled_trends:
+        scores[token_corpus.docs_containing(phrase_ids)] += 1
+    return scores
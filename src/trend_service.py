@@ -0,0 +1,127 @@
+import hashlib
+import threading
+from src.config import ARXIV_API_URL, TRENDS_REFRESH_INTERVAL
+from src.get_trends import (
+    _latest_cache_path,
+    _load_trends_from_cache,
+    _save_trends_to_cache,
+    get_trending_from_arxiv,
+    get_trends_from_corpus,
+)
+
+
+class TrendService:
+    """
+    Tendances gardees en memoire pour l'API, hors du chemin des requetes.
+
+    - au demarrage : lecture disque uniquement (cache de la semaine, sinon le
+      cache le plus recent, sinon tendances du corpus)
+    - en tache de fond : appel arXiv si le cache de la semaine manque, puis
+      rafraichissement toutes les `refresh_interval` secondes
+    - pendant ce temps les requetes servent la version precedente (stale-while-revalidate)
+
+    `version` change a chaque nouveau jeu de tendances : les caches en aval
+    (classement hot, ...) s'en servent comme cle.
+    """
+
+    def __init__(self, articles_df, term_stats=None, top_n=10,
+                 refresh_interval=TRENDS_REFRESH_INTERVAL, api_url=ARXIV_API_URL, abstracts=None):
+        self.articles_df = articles_df
+        self.term_stats = term_stats
+        self.abstracts = abstracts
+        self.top_n = top_n
+        self.refresh_interval = refresh_interval
+        self.api_url = api_url
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.trends = []
+        self.source = None
+        self.version = None
+
+    def get(self):
+        """(trends, version) courants, sans appel reseau."""
+        if self.version is None:
+            # service pas encore demarre : lecture disque / corpus
+            self.load_initial()
+        with self._lock:
+            return self.trends, self.version
+
+    def _set(self, trends, source):
+        trends = [str(t) for t in trends][:self.top_n]
+        digest = hashlib.sha1("\n".join(trends).encode("utf-8")).hexdigest()[:12]
+        with self._lock:
+            changed = trends != self.trends
+            self.trends = trends
+            self.source = source
+            self.version = digest
+        if changed:
+            print(f"[INFO] Trends mises a jour (source = {source})")
+
+    def load_initial(self):
+        """Premier jeu de tendances sans appel reseau."""
+        cached = _load_trends_from_cache()
+        if cached:
+            self._set(cached, "cache")
+            return
+        latest = _latest_cache_path()
+        if latest is not None:
+            previous = _load_trends_from_cache(latest)
+            if previous:
+                # semaine precedente en attendant arXiv
+                self._set(previous, "cache_previous")
+                return
+        self._set(self._corpus_trends(), "corpus")
+
+    def set_corpus(self, articles_df, term_stats=None, abstracts=None):
+        """Nouveau corpus (rechargement a chaud de l'API) ; tendances du corpus recalculees si servies."""
+        self.articles_df = articles_df
+        self.term_stats = term_stats
+        self.abstracts = abstracts
+        if self.source == "corpus":
+            self._set(self._corpus_trends(), "corpus")
+
+    def _corpus_trends(self):
+        return get_trends_from_corpus(
+            self.articles_df, n_terms=self.top_n, recent_years=3, term_stats=self.term_stats,
+            abstracts=self.abstracts,
+        )
+
+    def refresh(self):
+        """Un cycle de rafraichissement (appele par le thread de fond)."""
+        cached = _load_trends_from_cache()
+        if cached:
+            self._set(cached, "cache")
+            return True
+
+        arxiv_terms = get_trending_from_arxiv(max_results=self.top_n, api_url=self.api_url)
+        if arxiv_terms:
+            _save_trends_to_cache(arxiv_terms)
+            self._set(arxiv_terms, "arxiv")
+            return True
+
+        # arXiv indisponible : on garde la version servie actuellement
+        print(f"[WARN] arxiv indisponible -> on garde les trends '{self.source}'")
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print("Erreur rafraichissement tendances:", e)
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        if self.version is None:
+            self.load_initial()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="trend-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -0,0 +1,167 @@
+import re
+import numpy as np
+import pandas as pd
+
+KEY_BYTES = 24          # octets de cle gardes par entree (le reste est verifie a la volee)
+PRECOMPUTED_DEPTH = 3   # prefixes de 1..3 octets : top completions precalculees
+TOP_PER_NODE = 32       # completions gardees par prefixe precalcule
+
+KIND_TITLE, KIND_AUTHOR, KIND_TAG = 0, 1, 2
+KIND_NAMES = {KIND_TITLE: "title", KIND_AUTHOR: "author", KIND_TAG: "tag"}
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    return _SPACES_RE.sub(" ", str(text).lower()).strip()
+
+
+class Typeahead:
+    """
+    Autocompletion sur titres, auteurs et tags de profile_keywords.csv.
+
+    Tableau trie de cles (octets utf-8 tronques a KEY_BYTES) : un prefixe
+    correspond a une plage [lo, hi) trouvee par searchsorted. Les titres sont
+    indexes a chaque debut de mot ("deep lea" trouve "... deep learning ...").
+    Poids : cite_nb pour les titres, somme des cite_nb pour un auteur, les
+    tags passent devant. Pour les prefixes courts (plages enormes) le top est
+    precalcule ; au-dela, la plage est petite et un argpartition suffit.
+    """
+
+    def __init__(self, keys, weights, kinds, targets, offsets, labels, article_ids):
+        self.keys = keys
+        self.weights = weights
+        self.kinds = kinds
+        self.targets = targets          # indice dans labels
+        self.offsets = offsets          # debut (en caracteres) de la cle dans le label normalise
+        self.labels = labels
+        self.article_ids = article_ids  # id de l'article pour les titres, None sinon
+        self._top = self._precompute_top()
+
+    @classmethod
+    def from_articles(cls, articles_df, profile_kw_df=None):
+        labels, article_ids, label_kinds, label_weights = [], [], [], []
+
+        if "cite_nb" in articles_df.columns:
+            cites = pd.to_numeric(articles_df["cite_nb"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        else:
+            cites = np.zeros(len(articles_df))
+
+        titles = articles_df["title"].fillna("").astype(str).tolist()
+        ids = articles_df["id"].astype(str).tolist()
+        for title, article_id, cite in zip(titles, ids, cites):
+            labels.append(title)
+            article_ids.append(article_id)
+            label_kinds.append(KIND_TITLE)
+            label_weights.append(cite)
+
+        if "author" in articles_df.columns:
+            author_cites = {}
+            for authors, cite in zip(articles_df["author"].fillna("").astype(str), cites):
+                for name in authors.split(","):
+                    name = name.strip()
+                    if name:
+                        author_cites[name] = author_cites.get(name, 0.0) + cite
+            for name, cite in author_cites.items():
+                labels.append(name)
+                article_ids.append(None)
+                label_kinds.append(KIND_AUTHOR)
+                label_weights.append(cite)
+
+        if profile_kw_df is not None and "option" in profile_kw_df.columns:
+            # meme format que /api/tags
+            tags = sorted({opt.replace("_", " ").title() for opt in profile_kw_df["option"].dropna().unique()})
+            top_weight = max(label_weights, default=0.0) + 1.0
+            for tag in tags:
+                labels.append(tag)
+                article_ids.append(None)
+                label_kinds.append(KIND_TAG)
+                label_weights.append(top_weight)
+
+        # une entree par label, plus une par debut de mot pour les titres
+        keys, targets, offsets = [], [], []
+        for i, (label, kind) in enumerate(zip(labels, label_kinds)):
+            norm = normalize_query(label)
+            if not norm:
+                continue
+            starts = [0]
+            if kind == KIND_TITLE:
+                starts += [m.start() + 1 for m in re.finditer(" ", norm)]
+            for start in starts:
+                keys.append(norm[start:].encode("utf-8")[:KEY_BYTES])
+                targets.append(i)
+                offsets.append(start)
+
+        keys = np.array(keys, dtype=f"S{KEY_BYTES}")
+        targets = np.array(targets, dtype=np.int32)
+        order = np.argsort(keys, kind="stable")
+        label_weights = np.asarray(label_weights, dtype=np.float64)
+        label_kinds = np.asarray(label_kinds, dtype=np.int8)
+        return cls(
+            keys[order],
+            label_weights[targets[order]],
+            label_kinds[targets[order]],
+            targets[order],
+            np.array(offsets, dtype=np.int32)[order],
+            labels,
+            article_ids,
+        )
+
+    def _precompute_top(self):
+        """prefixe court (octets) -> positions des TOP_PER_NODE meilleures entrees."""
+        top = {}
+        n = len(self.keys)
+        if n == 0:
+            return top
+        for depth in range(1, PRECOMPUTED_DEPTH + 1):
+            prefixes = self.keys.astype(f"S{depth}")
+            # debut de chaque groupe de prefixe dans le tableau trie
+            starts = np.flatnonzero(np.r_[True, prefixes[1:] != prefixes[:-1]])
+            ends = np.r_[starts[1:], n]
+            for lo, hi in zip(starts, ends):
+                top[bytes(prefixes[lo])] = self._best(lo, hi, TOP_PER_NODE)
+        return top
+
+    def _best(self, lo, hi, k):
+        w = self.weights[lo:hi]
+        if hi - lo > k:
+            part = np.argpartition(-w, k)[:k]
+        else:
+            part = np.arange(hi - lo)
+        part = part[np.argsort(-w[part], kind="stable")]
+        return lo + part
+
+    def complete(self, q, limit=8):
+        norm = normalize_query(q)
+        if not norm:
+            return []
+        key = norm.encode("utf-8")
+        short = key[:KEY_BYTES]
+
+        if len(short) <= PRECOMPUTED_DEPTH:
+            positions = self._top.get(short, np.empty(0, dtype=np.int64))
+        else:
+            lo = np.searchsorted(self.keys, short, side="left")
+            hi = np.searchsorted(self.keys, short + b"\xff", side="left")
+            # marge pour les doublons (un titre peut matcher a plusieurs debuts de mot) ;
+            # requete plus longue que la cle : toute la plage, verifiee ci-dessous
+            k = hi - lo if len(key) > KEY_BYTES else limit * 4
+            positions = self._best(lo, hi, k) if hi > lo else []
+
+        results, seen = [], set()
+        for pos in positions:
+            target = int(self.targets[pos])
+            if target in seen:
+                continue
+            label = self.labels[target]
+            if len(key) > KEY_BYTES and not normalize_query(label)[self.offsets[pos]:].startswith(norm):
+                continue
+            seen.add(target)
+            kind = int(self.kinds[pos])
+            item = {"type": KIND_NAMES[kind], "label": label}
+            if kind == KIND_TITLE:
+                item["id"] = self.article_ids[target]
+            results.append(item)
+            if len(results) >= limit:
+                break
+        return results